@@ -0,0 +1,127 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## asyncio serving path for the ATIS endpoint
+# upstream calls are awaited concurrently, run with an ASGI server:
+#   gunicorn asgirun:app -k uvicorn.workers.UvicornWorker
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from messagemaker.message import message_try_async, metars, stations
+from messagemaker import client, vatsim
+import messagemaker.message
+from messagemaker.cache import Cache
+from messagemaker.profile import compile_airports
+import settings
+
+# upstream calls in flight at once, per process
+UPSTREAM_WORKERS = 64
+
+upstream = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS)
+# airport settings are compiled once, at startup
+AIRPORTS = compile_airports(settings.AIRPORTS, settings.TRANSITION)
+responses = Cache(
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    enabled=settings.RESPONSE_CACHE_ENABLED)
+
+def cache_key(metar, rwy, letter, *flags):
+    # only the first runway is used when composing the message
+    return (metar, rwy.split(',')[0], letter, *(bool(flag) for flag in flags))
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http':
+        if scope['path'] == '/':
+            status, body = 200, await hello_world(scope['query_string'])
+        else:
+            status, body = 404, 'not found'
+        await respond(send, status, body)
+
+async def lifespan(receive, send):
+    while True:
+        event = await receive()
+        if event['type'] == 'lifespan.startup':
+            metars.max_age = settings.METAR_MAX_AGE
+            vatsim.VATSIM_URL = settings.VATSIM_URL
+            messagemaker.message.AVWX_URL = settings.AVWX_URL
+            client.BREAKER_FAILURES = settings.BREAKER_FAILURES
+            client.BREAKER_RESET = settings.BREAKER_RESET
+            if settings.VATSIM_POLL_INTERVAL and not stations.running:
+                stations.start(
+                    settings.AIRPORTS,
+                    url=settings.VATSIM_URL,
+                    interval=settings.VATSIM_POLL_INTERVAL)
+            await send({ 'type': 'lifespan.startup.complete' })
+        elif event['type'] == 'lifespan.shutdown':
+            if stations.running:
+                stations.stop()
+            await send({ 'type': 'lifespan.shutdown.complete' })
+            return
+
+async def respond(send, status, body):
+    body = body.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'text/html; charset=utf-8'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({ 'type': 'http.response.body', 'body': body })
+
+async def hello_world(query_string):
+    args = { key: values[0] for key, values in parse_qs(
+        query_string.decode('latin-1'), keep_blank_values=True).items() }
+    metar = args.get('metar')
+    rwy = args.get('rwy')
+    letter = args.get('letter')
+
+    show_freqs = args.get('show_freqs', True)
+    hiro = args.get('hiro', False)
+    xpndr_startup = args.get('xpndr_startup', False)
+    rwy_35_clsd = args.get('rwy_35_clsd', False)
+
+    if metar and rwy and letter:
+        key = cache_key(
+            metar, rwy, letter, show_freqs, hiro, xpndr_startup, rwy_35_clsd)
+        response = responses.get(key)
+        if response is None:
+            with client.deadline(settings.REQUEST_DEADLINE):
+                response = await message_try_async(
+                    metar,
+                    rwy,
+                    letter,
+                    AIRPORTS,
+                    settings.TRANSITION,
+                    show_freqs,
+                    hiro,
+                    xpndr_startup,
+                    rwy_35_clsd,
+                    executor=upstream)
+            # failures are not cached, next request retries right away
+            if response != '[ATIS OUT OF SERVICE]':
+                responses.set(key, response)
+        return response
+    else:
+        return 'wrong usage'
@@ -0,0 +1,223 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## load test of the ATIS endpoint against local upstream stand-ins
+# fake avwx and vatsim servers are started with the given latency and error
+# rate, flaskrun.app is pointed at them and served on a threaded local
+# server, then requests are replayed at a fixed rate. run with:
+#   python -m benchmarks.load [--rate 50] [--duration 30] ...
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread, local
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+import requests
+
+from benchmarks.message import load_corpus
+from tests.stubs import AvwxStub, VatsimStub
+import settings
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+FLAGS = ('hiro', 'xpndr_startup', 'rwy_35_clsd')
+
+def upstream_metars(corpus):
+    """Last report of every airport in the corpus, as avwx answers them"""
+    metars = {}
+    for metar in corpus:
+        report = metar.split(' ', 1)[1] if metar.startswith('METAR ') else metar
+        metars[report.split(' ', 1)[0]] = report
+    return metars
+
+def upstream_stations(airports):
+    """A station online on the first clearance and departure frequencies
+    of every airport that has them"""
+    stations = []
+    for airport in airports.values():
+        for n, freqs in enumerate((airport['clr_freq'], airport['dep_freq'])):
+            if not freqs:
+                continue
+            stations.append({
+                'callsign': '%s_%d' % (airport['callsigns'][0], n),
+                'frequency': freqs[0][0],
+            })
+    return stations
+
+def request_mix(airports, size, seed=0):
+    """`size` query strings of the / endpoint, as Euroscope polls it"""
+    rand = random.Random(seed)
+    mix = []
+    for _ in range(size):
+        icao = rand.choice(sorted(airports))
+        query = {
+            'metar': icao,
+            'rwy': rand.choice(sorted(airports[icao]['approaches'])),
+            'letter': rand.choice(LETTERS),
+        }
+        if rand.random() < 0.2:
+            query['show_freqs'] = ''
+        for flag in FLAGS:
+            if rand.random() < 0.3:
+                query[flag] = 1
+        mix.append(query)
+    return mix
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+def serve(app):
+    server = make_server(
+        '127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def replay(url, mix, rate, duration, workers):
+    """Sends `rate` requests a second for `duration` seconds, regardless of
+    how fast they are answered. Latency counts from when each request was
+    due, so a slow server is not hidden by requests queuing up."""
+    sessions = local()
+    latencies = []
+    errors = { 'http': 0, 'out_of_service': 0, 'exceptions': 0 }
+    lock = Lock()
+
+    def send(due, query):
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+        error = None
+        try:
+            response = sessions.session.get(url, params=query, timeout=30)
+            if response.status_code != 200:
+                error = 'http'
+            elif response.text == '[ATIS OUT OF SERVICE]':
+                error = 'out_of_service'
+        except requests.RequestException:
+            error = 'exceptions'
+        took = time.monotonic() - due
+        with lock:
+            latencies.append(took)
+            if error:
+                errors[error] += 1
+
+    total = int(rate * duration)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.monotonic()
+        for n in range(total):
+            due = start + n / rate
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            executor.submit(send, due, mix[n % len(mix)])
+    elapsed = time.monotonic() - start
+
+    return report(latencies, errors, elapsed)
+
+def percentile(ordered, p):
+    """Nearest rank percentile of an ordered list"""
+    if not ordered:
+        return None
+    rank = max(0, int(round(p / 100 * len(ordered))) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def report(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+    return {
+        'requests': len(ordered),
+        'throughput': round(len(ordered) / elapsed, 2),
+        'latency_ms': {
+            'p50': ms(percentile(ordered, 50)),
+            'p90': ms(percentile(ordered, 90)),
+            'p99': ms(percentile(ordered, 99)),
+            'max': ms(ordered[-1] if ordered else None),
+        },
+        'errors': errors,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Load test of the ATIS endpoint')
+    parser.add_argument('--rate', type=float, default=50,
+        help='requests a second')
+    parser.add_argument('--duration', type=float, default=30,
+        help='seconds')
+    parser.add_argument('--workers', type=int, default=64,
+        help='concurrent clients')
+    parser.add_argument('--mix', type=int, default=500,
+        help='distinct requests replayed')
+    parser.add_argument('--avwx-latency', type=float, default=0.3)
+    parser.add_argument('--avwx-errors', type=float, default=0.0)
+    parser.add_argument('--vatsim-latency', type=float, default=0.2)
+    parser.add_argument('--vatsim-errors', type=float, default=0.0)
+    parser.add_argument('--output', help='write the report to a file')
+    args = parser.parse_args(argv)
+
+    avwx = AvwxStub(
+        upstream_metars(load_corpus()),
+        latency=args.avwx_latency,
+        error_rate=args.avwx_errors).start()
+    vatsim = VatsimStub(
+        upstream_stations(settings.AIRPORTS),
+        latency=args.vatsim_latency,
+        error_rate=args.vatsim_errors).start()
+
+    # settings are read when the app is imported
+    os.environ['AVWX_URL'] = avwx.metar_url
+    os.environ['VATSIM_URL'] = vatsim.clients_url
+    importlib.reload(settings)
+    flaskrun = importlib.import_module('flaskrun')
+    server = serve(flaskrun.app)
+
+    try:
+        host, port = server.server_address
+        results = replay(
+            'http://%s:%d/' % (host, port),
+            request_mix(settings.AIRPORTS, args.mix),
+            args.rate,
+            args.duration,
+            args.workers)
+    finally:
+        server.shutdown()
+        avwx.stop()
+        vatsim.stop()
+
+    results['upstream'] = {
+        'avwx': { 'requests': avwx.requests, 'latency': args.avwx_latency,
+                  'error_rate': args.avwx_errors },
+        'vatsim': { 'requests': vatsim.requests, 'latency': args.vatsim_latency,
+                    'error_rate': args.vatsim_errors },
+    }
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+    else:
+        print(output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## micro-benchmarks of the message hot path
+# upstream calls are stubbed, run from the repository root with:
+#   python -m benchmarks.message [--baseline FILE] [--threshold 0.2]
+#                                [--save FILE] [--output FILE]
+# exits with 1 when any benchmark is slower than the baseline by more than
+# the threshold
+from timeit import Timer
+from unittest import mock
+import argparse
+import json
+import os
+import platform
+import sys
+
+from messagemaker import message as mm
+from messagemaker.profile import compile_airports
+import settings
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus.txt')
+ONLINE_FREQS = ('118.100', '118.950', '119.100', '125.550')
+RUNWAYS = { 'LPPT': '03', 'LPPR': '17', 'LPFR': '28', 'LPMA': '05' }
+
+def load_corpus(filename=CORPUS):
+    with open(filename) as corpus:
+        return [line.strip() for line in corpus
+                    if line.strip() and not line.startswith('#')]
+
+def stubbed_upstream():
+    """Upstream calls answered from memory"""
+    return mock.patch.object(
+        mm, 'getonlinestations', lambda airport: ONLINE_FREQS)
+
+def cold_caches():
+    mm.parsed_metars.clear()
+    mm.atis_states.clear()
+
+def benchmarks(corpus):
+    """(name, function) of every benchmark, each runs the whole corpus"""
+    airports = compile_airports(settings.AIRPORTS, settings.TRANSITION)
+    reports = [mm.metarparse(metar) for metar in corpus]
+    rvr_reports = [report for report in reports
+                    if report.report.sky and report.report.sky.rvr]
+    sky_reports = [report for report in reports if report.report.sky]
+
+    def message():
+        for metar, report in zip(corpus, reports):
+            mm.message(metar, RUNWAYS[report.location], 'A', airports,
+                settings.TRANSITION, True, True, True, True)
+
+    def message_cold():
+        cold_caches()
+        message()
+
+    def message_settings():
+        for metar, report in zip(corpus, reports):
+            mm.message(metar, RUNWAYS[report.location], 'A', settings.AIRPORTS,
+                settings.TRANSITION, True, True, True, True)
+
+    def section(function):
+        def run():
+            for report in reports:
+                function(report)
+        return run
+
+    def transition_level():
+        for report in reports:
+            mm.transition_level(
+                settings.AIRPORTS[report.location], settings.TRANSITION, report)
+
+    def freqinfo():
+        for report in reports:
+            mm.freqinfo(settings.AIRPORTS[report.location], ONLINE_FREQS)
+
+    def profile_freqinfo():
+        for report in reports:
+            airports[report.location].freqinfo(ONLINE_FREQS)
+
+    def clouds():
+        for report in sky_reports:
+            mm.clouds(report)
+
+    def rvr():
+        for report in rvr_reports:
+            mm.rvr(report)
+
+    def weather():
+        for report in sky_reports:
+            mm.weather(report)
+
+    def parse():
+        for metar in corpus:
+            mm.metarparse(metar)
+
+    return (
+        ('message', message),
+        ('message_cold', message_cold),
+        ('message_settings', message_settings),
+        ('parse', parse),
+        ('wind', section(mm.wind)),
+        ('weather', weather),
+        ('sky', section(mm.sky)),
+        ('clouds', clouds),
+        ('rvr', rvr),
+        ('transition_level', transition_level),
+        ('freqinfo', freqinfo),
+        ('profile_freqinfo', profile_freqinfo),
+    )
+
+def run(corpus, repeat=5, number=200):
+    """Best time per corpus run of every benchmark, in microseconds"""
+    results = {}
+    with stubbed_upstream():
+        for name, function in benchmarks(corpus):
+            function()
+            best = min(Timer(function).repeat(repeat=repeat, number=number))
+            results[name] = best / number * 1e6
+    return results
+
+def regressions(results, baseline, threshold):
+    """Benchmarks slower than `baseline` by more than `threshold`"""
+    return { name: (baseline[name], took) for name, took in results.items()
+                if name in baseline and took > baseline[name] * (1 + threshold) }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmarks of the message hot path')
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--save', help='write the results as a baseline')
+    parser.add_argument('--output', help='write the report to a file')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    results = run(load_corpus(args.corpus), args.repeat, args.number)
+    report = {
+        'python': platform.python_version(),
+        'unit': 'us per corpus run',
+        'results': results,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            baseline = json.load(baseline)['results']
+        report['threshold'] = args.threshold
+        report['regressions'] = regressions(results, baseline, args.threshold)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+    else:
+        print(output)
+    if args.save:
+        with open(args.save, 'w') as baseline:
+            baseline.write(json.dumps(
+                { 'results': results }, indent=2, sort_keys=True))
+
+    return 1 if report.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
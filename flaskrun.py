@@ -19,15 +19,158 @@ along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
 """
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-from flask import Flask, request
-from messagemaker.message import message_try
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+from messagemaker.message import (message_try, message_batch, metars,
+    parse_metar, stations, caches, flights, out_of_service)
+from messagemaker import client, metrics, profiling, tracing, vatsim
+import messagemaker.message
+from messagemaker.cache import Cache
+from messagemaker.singleflight import SingleFlight
+from messagemaker.profile import compile_airports
+from messagemaker.push import Publisher
+from messagemaker.audio import load_clips, prerender, render, stream
+from messagemaker.bank import load_bank
+from messagemaker.formats import FORMATS, convert
+from messagemaker.silence import read_trimmed, silence
+from messagemaker.audiocache import AudioCache, audio_key, clips_digest
+from messagemaker.phrases import airport_phrases
 from flask_cors import CORS
 import settings
+import hmac
 import os
 
 app = Flask(__name__)
 CORS(app)
 
+# airport settings are compiled once, at startup
+AIRPORTS = compile_airports(settings.AIRPORTS, settings.TRANSITION)
+# and so are the audio clips, requests never read them from disk
+if os.path.exists(settings.AUDIO_BANK):
+    CLIPS = load_bank(settings.AUDIO_BANK)
+else:
+    CLIPS = load_clips(settings.AUDIO_PATH, read_trimmed)
+for icao, airport in settings.AIRPORTS.items():
+    for phrase in CLIPS.index.validate(airport_phrases(icao, airport)):
+        print('no audio clip for [%s], said at %s' % (phrase, icao))
+# static message parts are said the same way on every message, each
+# output format has its own clips and static parts converted up front
+STATIC_PARTS = { part for airport in AIRPORTS.values()
+                    for part in airport.static_parts() }
+VOICES = {}
+for name in settings.AUDIO_FORMATS:
+    clips = convert(CLIPS, FORMATS[name])
+    clips.gap = silence(clips.format, settings.AUDIO_GAP)
+    # cached audio is only said again with the very same clips
+    VOICES[name] = (
+        clips, prerender(STATIC_PARTS, clips), clips_digest(clips))
+responses = Cache(
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    enabled=settings.RESPONSE_CACHE_ENABLED)
+rendered = AudioCache(
+    max_bytes=settings.AUDIO_CACHE_BYTES,
+    path=settings.AUDIO_CACHE_PATH,
+    max_disk_bytes=settings.AUDIO_CACHE_DISK_BYTES)
+upstream = ThreadPoolExecutor(max_workers=8)
+caches['responses'] = responses
+caches['audio'] = rendered
+# concurrent misses of the same message wait on a single one
+in_flight = SingleFlight()
+flights['responses'] = in_flight
+metrics.ENABLED = settings.METRICS_ENABLED
+tracing.SAMPLE_RATE = settings.TRACE_SAMPLE_RATE
+tracing.traces = tracing.Traces(
+    size=settings.TRACE_BUFFER,
+    path=settings.TRACE_PATH,
+    max_bytes=settings.TRACE_FILE_BYTES)
+
+def report_version(icao, rwy, letter, airports, tl_tbl, show_freqs, *flags):
+    """What a subscribed message changes with, the report and the online
+    frequencies of its airport"""
+    return metars.get(icao), stations.online(icao) if show_freqs else None
+
+# subscribed messages are only rendered again for a new report, which is
+# pushed as soon as it is downloaded
+publisher = Publisher(
+    message_try,
+    interval=settings.PUSH_INTERVAL,
+    version=report_version)
+metars.listeners.append(lambda icao: publisher.wake())
+metars.max_age = settings.METAR_MAX_AGE
+vatsim.VATSIM_URL = settings.VATSIM_URL
+messagemaker.message.AVWX_URL = settings.AVWX_URL
+messagemaker.message.AVWX_SHARE = settings.AVWX_SHARE
+client.BREAKER_FAILURES = settings.BREAKER_FAILURES
+client.BREAKER_RESET = settings.BREAKER_RESET
+if settings.VATSIM_POLL_INTERVAL:
+    stations.start(
+        settings.AIRPORTS,
+        url=settings.VATSIM_URL,
+        interval=settings.VATSIM_POLL_INTERVAL)
+
+@app.before_request
+def start_trace():
+    if request.path.startswith('/admin/'):
+        return
+    g.trace = tracing.start(request.path, request.args.to_dict())
+
+@app.after_request
+def trace_header(response):
+    trace = g.get('trace')
+    if trace is not None:
+        response.headers['X-Trace-Id'] = trace.id
+    return response
+
+@app.teardown_request
+def finish_trace(exception):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        tracing.finish(trace)
+
+@app.before_request
+def start_profile():
+    if not settings.PROFILING_ENABLED or request.path.startswith('/admin/'):
+        return
+    format = request.headers.get('X-Profile')
+    if format is not None and admin() and format in profiling.FORMATS:
+        # this request answers with its own profile
+        profile = profiling.Profile(format)
+        if profile.start():
+            g.profile = profile
+            g.profile_reply = True
+    else:
+        g.profile = profiling.armed.take()
+
+@app.after_request
+def profile_reply(response):
+    if not g.pop('profile_reply', False):
+        return response
+    profile = g.pop('profile')
+    profile.stop()
+    body, mimetype = profile.output()
+    return Response(body, mimetype=mimetype)
+
+@app.teardown_request
+def finish_profile(exception):
+    # after streamed bodies, and when the request failed
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
+def admin():
+    """Whether the request carries the admin token"""
+    if not settings.ADMIN_TOKEN:
+        return False
+    given = request.headers.get('Authorization', '')
+    return hmac.compare_digest(
+        given.encode('utf-8'),
+        ('Bearer %s' % settings.ADMIN_TOKEN).encode('utf-8'))
+
+def cache_key(metar, rwy, letter, *flags):
+    # only the first runway is used when composing the message
+    return (metar, rwy.split(',')[0], letter, *(bool(flag) for flag in flags))
+
 @app.route('/')
 def hello_world():
     metar = request.args.get('metar')
@@ -40,18 +183,255 @@ def hello_world():
     rwy_35_clsd = request.args.get('rwy_35_clsd', False)
 
     if metar and rwy and letter:
-        return message_try(
+        return cached_message(
+            metar, rwy, letter, show_freqs, hiro, xpndr_startup, rwy_35_clsd)
+    else:
+        return 'wrong usage'
+
+@app.route('/audio')
+def audio():
+    """The message for the / endpoint arguments, said as a WAV file, sent
+    as it is assembled with stream=1, format is one of AUDIO_FORMATS"""
+    metar = request.args.get('metar')
+    rwy = request.args.get('rwy')
+    letter = request.args.get('letter')
+
+    show_freqs = request.args.get('show_freqs', True)
+    hiro = request.args.get('hiro', False)
+    xpndr_startup = request.args.get('xpndr_startup', False)
+    rwy_35_clsd = request.args.get('rwy_35_clsd', False)
+
+    format = request.args.get('format', 'pcm')
+
+    if not (metar and rwy and letter) or format not in VOICES:
+        return 'wrong usage', 400
+
+    clips, segments, digest = VOICES[format]
+    message = cached_message(
+        metar, rwy, letter, show_freqs, hiro, xpndr_startup, rwy_35_clsd)
+    key = audio_key(message, format, digest)
+    atis = rendered.get(key)
+    if atis is None and request.args.get('stream'):
+        # the request, with its trace and profile, ends with the body
+        return Response(
+            stream_with_context(streamed(key, message, clips, segments)),
+            mimetype='audio/wav')
+    if atis is None:
+        with tracing.span('audio'):
+            atis = render(message, clips, segments)
+        rendered.set(key, atis)
+    return Response(atis, mimetype='audio/wav')
+
+def streamed(key, message, clips, segments):
+    """Sends the message audio as it is assembled, and caches it once
+    all of it was sent"""
+    chunks = []
+    for chunk in stream(message, clips, segments):
+        chunks.append(chunk)
+        # WSGI servers only take bytes, bank clips are memoryviews
+        yield bytes(chunk) if isinstance(chunk, memoryview) else chunk
+    rendered.set(key, b''.join(chunks))
+
+def cached_message(metar,
+                   rwy,
+                   letter,
+                   show_freqs,
+                   hiro,
+                   xpndr_startup,
+                   rwy_35_clsd):
+    key = cache_key(
+        metar, rwy, letter, show_freqs, hiro, xpndr_startup, rwy_35_clsd)
+    response = responses.get(key)
+    if response is None:
+        # requests waiting on the same message keep their own deadline
+        with client.deadline(settings.REQUEST_DEADLINE):
+            try:
+                response = in_flight.do(
+                    key,
+                    fresh_message,
+                    key,
+                    metar,
+                    rwy,
+                    letter,
+                    show_freqs,
+                    hiro,
+                    xpndr_startup,
+                    rwy_35_clsd)
+            except client.DeadlineExceeded:
+                out_of_service.inc()
+                response = '[ATIS OUT OF SERVICE]'
+    return response
+
+def fresh_message(key,
+                  metar,
+                  rwy,
+                  letter,
+                  show_freqs,
+                  hiro,
+                  xpndr_startup,
+                  rwy_35_clsd):
+    with tracing.span('message'):
+        response = message_try(
             metar,
             rwy,
             letter,
-            settings.AIRPORTS,
+            AIRPORTS,
             settings.TRANSITION,
             show_freqs,
             hiro,
             xpndr_startup,
             rwy_35_clsd)
-    else:
-        return 'wrong usage'
+    # failures are not cached, next request retries right away
+    if response != '[ATIS OUT OF SERVICE]':
+        responses.set(key, response)
+    return response
+
+@app.route('/subscribe')
+def subscribe():
+    """Server-sent events stream of the message for the / endpoint
+    arguments, a new event is pushed whenever the message changes"""
+    metar = request.args.get('metar')
+    rwy = request.args.get('rwy')
+    letter = request.args.get('letter')
+
+    show_freqs = request.args.get('show_freqs', True)
+    hiro = request.args.get('hiro', False)
+    xpndr_startup = request.args.get('xpndr_startup', False)
+    rwy_35_clsd = request.args.get('rwy_35_clsd', False)
+
+    if not (metar and rwy and letter):
+        return 'wrong usage', 400
+
+    # Euroscope sends the report it has, subscribers follow their airport
+    # reports from then on
+    try:
+        icao = metar if len(metar) == 4 else parse_metar(metar).location
+    except Exception:
+        return 'wrong usage', 400
+    if icao not in AIRPORTS:
+        return 'wrong usage', 400
+
+    subscription = publisher.subscribe(
+        cache_key(
+            icao, rwy, letter, show_freqs, hiro, xpndr_startup, rwy_35_clsd),
+        (
+            icao,
+            rwy,
+            letter,
+            AIRPORTS,
+            settings.TRANSITION,
+            show_freqs,
+            hiro,
+            xpndr_startup,
+            rwy_35_clsd))
+
+    def events():
+        try:
+            for message in subscription:
+                if message is None:
+                    # keeps the connection open, and finds closed ones
+                    yield ': keepalive\n\n'
+                else:
+                    # the weather sections that changed, for clients that
+                    # listen for them, before the message itself
+                    changed = getattr(message, 'changed', None)
+                    if changed:
+                        yield 'event: changed\ndata: %s\n\n' % ' '.join(
+                            sorted(changed))
+                    yield 'data: %s\n\n' % message
+        finally:
+            subscription.close()
+
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={ 'Cache-Control': 'no-cache' })
+
+def valid_entry(entry):
+    """Whether a /batch entry has the / endpoint arguments, the text ones
+    as non empty strings and the flags as JSON scalars"""
+    if not isinstance(entry, dict):
+        return False
+    if not all(isinstance(entry.get(name), str) and entry[name]
+               for name in ('metar', 'rwy', 'letter')):
+        return False
+    return all(isinstance(entry.get(flag), (bool, int, str, type(None)))
+               for flag in ('show_freqs', 'hiro', 'xpndr_startup',
+                            'rwy_35_clsd'))
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Messages for a list of entries, each with the same arguments as the
+    / endpoint, in the same order"""
+    entries = request.get_json(silent=True)
+    if not isinstance(entries, list) or not all(
+            valid_entry(entry) for entry in entries):
+        return 'wrong usage', 400
+
+    with client.deadline(settings.REQUEST_DEADLINE):
+        atis = message_batch(
+            [(
+                entry['metar'],
+                entry['rwy'],
+                entry['letter'],
+                entry.get('show_freqs', True),
+                entry.get('hiro', False),
+                entry.get('xpndr_startup', False),
+                entry.get('rwy_35_clsd', False),
+            ) for entry in entries],
+            AIRPORTS,
+            settings.TRANSITION,
+            upstream)
+    return jsonify(atis)
+
+@app.route('/metrics')
+def metrics_text():
+    """Hot path timings and counters, in Prometheus text format"""
+    return Response(
+        metrics.render(),
+        mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/traces')
+def admin_traces():
+    """Most recent sampled traces, those taking at least min_ms when
+    given, or the one with trace_id"""
+    if not admin():
+        return 'forbidden', 403
+    try:
+        min_ms = float(request.args.get('min_ms', 0))
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return 'wrong usage', 400
+    return jsonify(tracing.traces.query(
+        min_ms=min_ms,
+        limit=limit,
+        trace_id=request.args.get('trace_id')))
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """POST profiles the next `requests` requests into a single profile of
+    `format`, GET returns it"""
+    if not settings.PROFILING_ENABLED:
+        return 'not found', 404
+    if not admin():
+        return 'forbidden', 403
+    if not profiling.supported():
+        return 'profiling needs thread workers, not gevent', 501
+    if request.method == 'POST':
+        format = request.args.get('format', 'collapsed')
+        try:
+            count = int(request.args.get('requests', 1))
+        except ValueError:
+            return 'wrong usage', 400
+        if format not in profiling.FORMATS or count < 1:
+            return 'wrong usage', 400
+        profiling.armed.arm(count, format)
+        return jsonify({ 'requests': count, 'format': format })
+    if profiling.armed.profile is None:
+        return 'nothing profiled', 404
+    body, mimetype = profiling.armed.profile.output()
+    return Response(body, mimetype=mimetype, headers={
+        'X-Profile-Remaining': str(profiling.armed.remaining) })
 
 if __name__ == '__main__':
     if 'PORT' in os.environ:
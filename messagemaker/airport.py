@@ -0,0 +1,62 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## message parts that only depend on the airport settings
+# shared by the message sections and the compiled airport profiles
+from string import Template
+
+def freq(airport, online_freqs, freq_type):
+    parts = airport[freq_type]
+    for freq, part in parts:
+        if freq in online_freqs:
+            return freq, part
+
+    return None, None
+
+def freqinfo(airport, online_freqs):
+    dep_freq, dep_msg = freq(airport, online_freqs, 'dep_freq')
+    clr_freq, clr_msg = freq(airport, online_freqs, 'clr_freq')
+    del_freq, _ = airport['clr_freq'][0]
+    parts = []
+
+    twr_online = True if airport['twr'] in online_freqs else False
+    if dep_freq is not None:
+        if dep_freq != clr_freq and twr_online:
+            parts.append(dep_msg)
+        parts.append(clr_msg)
+        return ' '.join(parts)
+    if clr_freq != del_freq and clr_msg is not None:
+        parts.append(clr_msg)
+        return ' '.join(parts)
+
+def approach(rwy, airport):
+    template = '[EXP ${approach} APCH] [RWY IN USE ${rwy}]'
+    return Template(template).substitute(
+        rwy=rwy,
+        approach=airport['approaches'][rwy])
+
+def arrdep_info(airport, rwy):
+    if rwy not in airport['arrdep_info']:
+        return ''
+    parts = []
+    for rwy_message in airport['arrdep_info'][rwy]:
+        parts.append(rwy_message)
+    return ' '.join(parts)
@@ -0,0 +1,162 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+from messagemaker.phrases import PhraseIndex
+import numpy as np
+import os
+import struct
+import wave
+
+## clips are all kept in the format of the euroscope audio package
+RATE = 7350 # Hz
+SAMPLE_WIDTH = 2 # bytes, 16 bit
+CHANNELS = 1
+
+Format = namedtuple('Format', ('name', 'tag', 'rate', 'width'))
+
+WAVE_FORMAT_PCM = 1
+PCM = Format('pcm', WAVE_FORMAT_PCM, RATE, SAMPLE_WIDTH)
+
+class Clips:
+    """Raw PCM of every clip by id, and the index resolving messages to
+    those ids"""
+
+    def __init__(self, clips, format=PCM):
+        self.index = PhraseIndex(clips)
+        self.buffers = [clips[name] for name in self.index.names]
+        self.format = format
+        # said between any two clips
+        self.gap = b''
+
+    def __getitem__(self, name):
+        return self.buffers[self.index.ids[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+def load_clips(path, read=None):
+    """Every clip in `path`, as returned by `read`"""
+    read = read or read_clip
+    clips = {}
+    for filename in os.listdir(path):
+        name, ext = os.path.splitext(filename)
+        if ext.lower() == '.wav':
+            clips[name] = read(os.path.join(path, filename))
+    return Clips(clips)
+
+def read_clip(filename):
+    with wave.open(filename, 'rb') as clip:
+        channels = clip.getnchannels()
+        width = clip.getsampwidth()
+        rate = clip.getframerate()
+        frames = clip.readframes(clip.getnframes())
+
+    samples = sample_values(frames, width)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).sum(axis=1) // channels
+    if rate != RATE:
+        length = len(samples) * RATE // rate
+        position = np.arange(length) * (rate / RATE)
+        samples = np.round(np.interp(
+            position, np.arange(len(samples)), samples)).astype(np.int32)
+    return samples.astype('<i2').tobytes()
+
+def sample_values(frames, width):
+    """16 bit values of the samples in `frames`, the extra precision of
+    wider samples is dropped"""
+    if width == 1:
+        # 8 bit WAV samples are unsigned
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.int32)
+                - 128) << 8
+    if width == 3:
+        # the two most significant bytes of each little endian sample
+        frames = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)[:, 1:]
+        return np.ascontiguousarray(frames).view('<i2').ravel() \
+            .astype(np.int32)
+    if width == 4:
+        return np.frombuffer(frames, dtype='<i4') >> 16
+    return np.frombuffer(frames, dtype='<i2').astype(np.int32)
+
+def render(message, clips, segments=None):
+    """The message said as a single WAV file, phrases without a clip are
+    left out"""
+    return wav(b''.join(buffers(message, clips, segments)), clips.format)
+
+def stream(message, clips, segments=None):
+    """Same as render(), as the WAV header followed by each buffer in the
+    order they are said, none of them copied"""
+    # sizes are known before anything is said, nothing is held meanwhile
+    length = sum(len(buffer) for buffer in buffers(message, clips, segments))
+    yield wav_header(length, clips.format)
+    yield from buffers(message, clips, segments)
+
+def buffers(message, clips, segments=None):
+    """PCM buffers of a message, in the order they are said
+
+    Parts of a composed message found in `segments` come from there, the
+    others are resolved to clips. The clips gap is said between each."""
+    if segments is None:
+        parts = (message,)
+    else:
+        parts = getattr(message, 'parts', (message,))
+    clip_buffers = clips.buffers
+    gap = clips.gap
+    said = False
+    for part in parts:
+        segment = segments.get(part) if segments is not None else None
+        if segment is not None:
+            said_buffers = (segment,) if segment else ()
+        else:
+            said_buffers = (clip_buffers[id]
+                            for id in clips.index.resolve(part))
+        for buffer in said_buffers:
+            if gap and said:
+                yield gap
+            yield buffer
+            said = True
+
+def pcm(text, clips):
+    return b''.join(buffers(text, clips))
+
+def prerender(parts, clips):
+    """Raw PCM of each static message part"""
+    return { part: pcm(part, clips) for part in parts if part }
+
+def wav(frames, format=PCM):
+    return wav_header(len(frames), format) + frames
+
+def wav_header(length, format=PCM):
+    """Header of a WAV file with `length` bytes of mono audio"""
+    block = CHANNELS * format.width
+    fmt = struct.pack('<HHIIHH',
+        format.tag, CHANNELS, format.rate, format.rate * block, block,
+        format.width * 8)
+    chunks = []
+    if format.tag != WAVE_FORMAT_PCM:
+        # companded formats have an extension size, and the sample count
+        fmt += struct.pack('<H', 0)
+        chunks.append(b'fact' + struct.pack('<II', 4, length // block))
+    chunks.insert(0, b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+    chunks.append(b'data' + struct.pack('<I', length))
+    header = b''.join(chunks)
+    return b'RIFF' + struct.pack('<I', 4 + len(header) + length) + b'WAVE' \
+        + header
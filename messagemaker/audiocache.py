@@ -0,0 +1,168 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+import os
+import tempfile
+import time
+
+# partial files older than this were left by a writer that died
+PARTIAL_AGE = 60 # seconds
+
+def audio_key(message, *variant):
+    """Content address of a message, the same for any spacing"""
+    text = ' '.join(message.split() + [str(part) for part in variant])
+    return sha1(text.encode('utf-8')).hexdigest()
+
+def clips_digest(clips):
+    """Content address of the clips a message is said with, the gap said
+    between them included"""
+    digest = sha1()
+    for name, buffer in zip(clips.index.names, clips.buffers):
+        digest.update(name.encode('utf-8'))
+        digest.update(len(buffer).to_bytes(8, 'little'))
+        digest.update(buffer)
+    digest.update(clips.gap)
+    digest.update(repr(tuple(clips.format)).encode('utf-8'))
+    return digest.hexdigest()
+
+class AudioCache:
+    """Rendered audio by content address, least recently used first out
+
+    The memory tier holds up to `max_bytes`. With a `path`, evicted and new
+    entries are also kept on disk, up to `max_disk_bytes`."""
+
+    def __init__(self, max_bytes=32 << 20, path=None, max_disk_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load_disk()
+
+    def _load_disk(self):
+        entries = []
+        for filename in os.listdir(self.path):
+            key, ext = os.path.splitext(filename)
+            stat = os.stat(os.path.join(self.path, filename))
+            if ext == '.wav':
+                entries.append((stat.st_mtime, key, stat.st_size))
+            elif ext == '.partial' and \
+                    time.time() - stat.st_mtime > PARTIAL_AGE:
+                # other workers may still be writing newer ones
+                try:
+                    os.remove(os.path.join(self.path, filename))
+                except OSError:
+                    pass
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def filename(self, key):
+        return os.path.join(self.path, key + '.wav')
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+
+        try:
+            with open(self.filename(key), 'rb') as cached:
+                data = cached.read()
+            os.utime(self.filename(key))
+        except OSError:
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def set(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+            if (self.path is None or key in self._disk
+                    or len(data) > self.max_disk_bytes):
+                return
+
+        # written in full before it is published, a concurrent get() never
+        # reads a partial file
+        fd, partial = tempfile.mkstemp('.partial', dir=self.path)
+        with os.fdopen(fd, 'wb') as cached:
+            cached.write(data)
+
+        evicted = []
+        with self._lock:
+            if key in self._disk:
+                os.remove(partial)
+            else:
+                os.replace(partial, self.filename(key))
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+                while self._disk_bytes > self.max_disk_bytes:
+                    old, size = self._disk.popitem(last=False)
+                    self._disk_bytes -= size
+                    evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self.filename(old))
+            except OSError:
+                pass
+
+    def _remember(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def stats(self):
+        return {
+            'memory_bytes': self._memory_bytes,
+            'disk_bytes': self._disk_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
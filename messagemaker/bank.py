@@ -0,0 +1,112 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## packed clip bank
+# every clip of the audio directory, in the same format, in a single file:
+#
+#   magic, rate, sample width, channels, clip count
+#   per clip: name length, name, offset, length
+#   PCM data of every clip, each starting on a 16 byte boundary
+#
+# all integers are little endian, offsets are from the start of the file
+from concurrent.futures import ProcessPoolExecutor
+from mmap import mmap, ACCESS_READ
+import os
+import struct
+import sys
+from messagemaker.audio import Clips, RATE, SAMPLE_WIDTH, CHANNELS, read_clip
+from messagemaker.silence import read_trimmed
+
+MAGIC = b'MMBANK1\0'
+HEADER = struct.Struct('<8sIHHI')
+NAME = struct.Struct('<H')
+ENTRY = struct.Struct('<QQ')
+ALIGN = 16
+
+def build_bank(path, filename, processes=None, trim=True):
+    """Converts every clip in `path` into a bank at `filename`, the clips
+    are read, converted and trimmed of silence by a pool of `processes`"""
+    names, files = [], []
+    for clip in sorted(os.listdir(path)):
+        name, ext = os.path.splitext(clip)
+        if ext.lower() == '.wav':
+            names.append(name)
+            files.append(os.path.join(path, clip))
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        clips = list(pool.map(
+            read_trimmed if trim else read_clip, files, chunksize=8))
+
+    encoded = [name.encode('utf-8') for name in names]
+    offset = HEADER.size + sum(
+        NAME.size + len(name) + ENTRY.size for name in encoded)
+    entries = []
+    for clip in clips:
+        offset = aligned(offset)
+        entries.append((offset, len(clip)))
+        offset += len(clip)
+
+    partial = filename + '.partial'
+    with open(partial, 'wb') as bank:
+        bank.write(HEADER.pack(MAGIC, RATE, SAMPLE_WIDTH, CHANNELS, len(clips)))
+        for name, (offset, length) in zip(encoded, entries):
+            bank.write(NAME.pack(len(name)))
+            bank.write(name)
+            bank.write(ENTRY.pack(offset, length))
+        for clip, (offset, _) in zip(clips, entries):
+            bank.write(b'\0' * (offset - bank.tell()))
+            bank.write(clip)
+    # readers never see a half written bank
+    os.replace(partial, filename)
+    return len(clips)
+
+def aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+def load_bank(filename):
+    """Clips from a bank, each a view on the memory mapped file"""
+    with open(filename, 'rb') as bank:
+        data = mmap(bank.fileno(), 0, access=ACCESS_READ)
+
+    magic, rate, width, channels, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError('%s is not a clip bank' % filename)
+    if (rate, width, channels) != (RATE, SAMPLE_WIDTH, CHANNELS):
+        raise ValueError('%s has clips in another format' % filename)
+
+    view = memoryview(data)
+    clips = {}
+    position = HEADER.size
+    for _ in range(count):
+        length, = NAME.unpack_from(data, position)
+        position += NAME.size
+        name = bytes(data[position:position + length]).decode('utf-8')
+        position += length
+        offset, size = ENTRY.unpack_from(data, position)
+        position += ENTRY.size
+        clips[name] = view[offset:offset + size]
+    return Clips(clips)
+
+if __name__ == '__main__':
+    # python -m messagemaker.bank audio audio.bank [--no-trim]
+    path, filename = sys.argv[1:3]
+    count = build_bank(path, filename, trim='--no-trim' not in sys.argv)
+    print('%d clips packed into %s' % (count, filename))
@@ -0,0 +1,85 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Lock
+import time
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream that keeps failing"""
+
+class CircuitBreaker:
+    """Stops calling an upstream after `failures` failures in a row
+
+    While open, calls fail right away. After `reset_timeout` seconds a
+    single trial call is let through, closing the circuit again when it
+    succeeds and keeping it open for another `reset_timeout` otherwise."""
+
+    def __init__(self, failures=5, reset_timeout=30, clock=time.monotonic):
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened = None
+        self.trips = 0
+        self._trial = False
+        self._lock = Lock()
+
+    @property
+    def state(self):
+        if self.opened is None:
+            return 'closed'
+        if self.clock() - self.opened >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Whether a call may be made now"""
+        if self.opened is None:
+            return True
+        with self._lock:
+            if self.opened is None:
+                return True
+            if self._trial or self.clock() - self.opened < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened is None and
+                    self.failures >= self.max_failures):
+                if self.opened is None:
+                    self.trips += 1
+                self.opened = self.clock()
+            self._trial = False
+
+    def cancel(self):
+        """A call that says nothing about the upstream, a trial call may
+        be made again"""
+        with self._lock:
+            self._trial = False
@@ -0,0 +1,220 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## shared HTTP client for all upstream calls
+# connections are pooled and kept alive per host, every request has connect
+# and read timeouts, and failed requests are retried with backoff.
+# calls made under a deadline() only get the time it has left, retries and
+# backoff included, and every upstream has a circuit breaker that fails
+# calls fast while it is down
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from messagemaker import metrics, tracing
+from messagemaker.breaker import CircuitBreaker, CircuitOpen
+import requests
+import time
+
+CONNECT_TIMEOUT = 3.05 # seconds
+READ_TIMEOUT = 10 # seconds
+RETRIES = 2
+BACKOFF = 0.3 # seconds, doubles on every retry
+RETRY_STATUSES = (500, 502, 503, 504)
+POOL_SIZE = 10 # connections kept alive per host
+BREAKER_FAILURES = 5 # in a row, to stop calling an upstream
+BREAKER_RESET = 30 # seconds, before trying it again
+# calls made with less than this part of the deadline left, after earlier
+# calls used the rest, do not count against the upstream when timing out
+BLAMELESS_LEFT = 0.5
+
+_session = None
+_lock = Lock()
+_deadline = ContextVar('deadline', default=None)
+
+breakers = {}
+
+class DeadlineExceeded(requests.Timeout):
+    """No time was left for an upstream call"""
+
+upstream_seconds = metrics.histogram(
+    'messagemaker_upstream_seconds',
+    'Time waiting on upstream requests, retries included',
+    ('upstream',))
+upstream_failures = metrics.counter(
+    'messagemaker_upstream_failures_total',
+    'Upstream requests that raised or were not answered with success',
+    ('upstream',))
+metrics.collected(
+    'messagemaker_circuit_open',
+    'Whether calls to an upstream are failing fast',
+    ('upstream',),
+    lambda: { (upstream,): int(circuit.state == 'open')
+                for upstream, circuit in breakers.items() },
+    type='gauge')
+metrics.collected(
+    'messagemaker_circuit_trips_total',
+    'Times the circuit of an upstream opened',
+    ('upstream',),
+    lambda: { (upstream,): circuit.trips
+                for upstream, circuit in breakers.items() })
+
+def session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+def new_session():
+    # retries are made by get(), where they keep to the deadline
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+        max_retries=0)
+    s = requests.Session()
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+def get(url, timeout=None, upstream='other', share=1, **kwargs):
+    """GET on the shared session, timed and counted under `upstream`
+
+    Server errors and failed connections are retried RETRIES times. Under
+    a deadline() the call, backoff included, ends after `share` of the time
+    left, each attempt getting its part of what remains. Raises CircuitOpen
+    while `upstream` is down, timeouts of calls left with little of the
+    deadline by earlier ones are not held against it."""
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (timeout, timeout)
+    until = None
+    blameless = False
+    left = remaining()
+    if left is not None:
+        if left <= 0:
+            upstream_failures.inc(upstream)
+            raise DeadlineExceeded('no time left to call %s' % upstream)
+        until = time.monotonic() + left * share
+        blameless = left < _deadline.get()[1] * BLAMELESS_LEFT
+
+    circuit = breaker(upstream)
+    if not circuit.allow():
+        upstream_failures.inc(upstream)
+        raise CircuitOpen('%s is failing, not calling it' % upstream)
+
+    with upstream_seconds.time(upstream), tracing.span(upstream):
+        try:
+            response = attempts(url, timeout, until, kwargs)
+        except Exception as error:
+            upstream_failures.inc(upstream)
+            if blameless and isinstance(error, requests.Timeout):
+                # the request ran out of time, not the upstream
+                circuit.cancel()
+            else:
+                circuit.failure()
+            raise
+    if response.status_code >= 500:
+        circuit.failure()
+    else:
+        circuit.success()
+    if not response.ok:
+        upstream_failures.inc(upstream)
+    return response
+
+def attempts(url, timeout, until, kwargs):
+    """Response of the last attempt, or the exception it raised, no attempt
+    or backoff goes past `until`"""
+    response = error = None
+    for attempt in range(RETRIES + 1):
+        if attempt:
+            backoff = BACKOFF * 2 ** (attempt - 1)
+            if until is not None and time.monotonic() + backoff >= until:
+                break
+            time.sleep(backoff)
+        limits = timeout
+        if until is not None:
+            budget = (until - time.monotonic()) / (RETRIES + 1 - attempt)
+            if budget <= 0:
+                break
+            limits = (min(timeout[0], budget), min(timeout[1], budget))
+        try:
+            response = session().get(url, timeout=limits, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as crap:
+            response, error = None, crap
+            continue
+        error = None
+        if response.status_code not in RETRY_STATUSES:
+            return response
+    if error is not None:
+        raise error
+    if response is None:
+        raise DeadlineExceeded('no time left to call %s' % url)
+    return response
+
+@contextmanager
+def deadline(seconds):
+    """Upstream calls in the block share `seconds` between them, None
+    leaves them with the default timeouts"""
+    if seconds is None:
+        yield
+        return
+    token = _deadline.set((time.monotonic() + seconds, seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining():
+    """Seconds left of the current deadline, None outside of one"""
+    current = _deadline.get()
+    return None if current is None else current[0] - time.monotonic()
+
+def breaker(upstream):
+    circuit = breakers.get(upstream)
+    if circuit is None:
+        with _lock:
+            circuit = breakers.setdefault(
+                upstream, CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET))
+    return circuit
+
+def stats():
+    """Connections opened and requests made on reused connections"""
+    new = made = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    new += pool.num_connections
+                    made += pool.num_requests
+    return { 'requests': made, 'new': new, 'reused': made - new }
+
+def reset():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        breakers.clear()
@@ -0,0 +1,110 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## radio quality output formats
+# clips are converted once, when loaded, as a whole bank at a time
+import numpy as np
+from messagemaker.audio import Clips, Format, PCM
+
+WAVE_FORMAT_ALAW = 6
+WAVE_FORMAT_MULAW = 7
+
+FORMATS = {
+    'pcm': PCM,
+    # for clients that only play 8 kHz PCM, upsampled from the clips and so
+    # slightly larger than pcm, ulaw and alaw are the low bandwidth ones
+    'pcm8k': Format('pcm8k', PCM.tag, 8000, 2),
+    'ulaw': Format('ulaw', WAVE_FORMAT_MULAW, 8000, 1),
+    'alaw': Format('alaw', WAVE_FORMAT_ALAW, 8000, 1),
+}
+
+# G.711 segment ends
+ULAW_SEGMENTS = np.array(
+    (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF), dtype=np.int32)
+ALAW_SEGMENTS = np.array(
+    (0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF), dtype=np.int32)
+
+def convert(clips, format):
+    """All `clips` in another format, each clip a view on a single buffer"""
+    if format == clips.format:
+        return clips
+    samples, lengths = bank_samples(clips)
+    if format.rate != clips.format.rate:
+        samples, lengths = resample(
+            samples, lengths, clips.format.rate, format.rate)
+
+    if format.tag == WAVE_FORMAT_MULAW:
+        data = ulaw(samples)
+    elif format.tag == WAVE_FORMAT_ALAW:
+        data = alaw(samples)
+    else:
+        data = samples.astype('<i2')
+
+    view = memoryview(data.tobytes())
+    ends = np.cumsum(lengths) * format.width
+    starts = ends - lengths * format.width
+    return Clips(
+        { name: view[start:end] for name, start, end
+            in zip(clips.index.names, starts.tolist(), ends.tolist()) },
+        format)
+
+def bank_samples(clips):
+    """Samples of every clip, one after the other, and each clip length"""
+    arrays = [np.frombuffer(buffer, dtype='<i2') for buffer in clips.buffers]
+    lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+    return np.concatenate(arrays).astype(np.int32), lengths
+
+def resample(samples, lengths, rate, new_rate):
+    """Linear interpolation of every clip at `new_rate`, none of them
+    reaching into the next"""
+    new_lengths = lengths * new_rate // rate
+    starts = np.cumsum(lengths) - lengths
+    new_starts = np.cumsum(new_lengths) - new_lengths
+
+    clip = np.repeat(np.arange(len(lengths)), new_lengths)
+    position = (np.arange(new_lengths.sum()) - new_starts[clip]) \
+        * (rate / new_rate)
+    position = np.minimum(position, lengths[clip] - 1) + starts[clip]
+
+    resampled = np.interp(position, np.arange(len(samples)), samples)
+    return np.round(resampled).astype(np.int32), new_lengths
+
+def ulaw(samples):
+    """G.711 mu-law of 16 bit samples"""
+    value = samples >> 2
+    mask = np.where(value < 0, 0x7F, 0xFF)
+    value = np.minimum(np.abs(value), 8159) + 0x21
+    segment = np.searchsorted(ULAW_SEGMENTS, value)
+    coded = (segment << 4) | ((value >> (segment + 1)) & 0xF)
+    coded = np.where(segment >= 8, 0x7F, coded)
+    return (coded ^ mask).astype(np.uint8)
+
+def alaw(samples):
+    """G.711 A-law of 16 bit samples"""
+    value = samples >> 3
+    negative = value < 0
+    mask = np.where(negative, 0x55, 0xD5)
+    value = np.where(negative, -value - 1, value)
+    segment = np.searchsorted(ALAW_SEGMENTS, value)
+    shift = np.where(segment < 2, 1, segment)
+    coded = (np.minimum(segment, 7) << 4) | ((value >> shift) & 0xF)
+    coded = np.where(segment >= 8, 0x7F, coded)
+    return (coded ^ mask).astype(np.uint8)
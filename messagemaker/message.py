@@ -22,12 +22,37 @@ along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
 from string import Template
 from messagemaker import *
 from bisect import bisect_right
-import requests
-import json
 import traceback
-from itertools import chain
+import asyncio
+import time
 from collections import namedtuple
+from itertools import chain
 from avweather.metar import parse as metarparse
+from messagemaker import client, metrics, tracing
+from messagemaker.cache import Cache
+from messagemaker.metarcache import MetarCache
+from messagemaker.airport import approach, arrdep_info, freq, freqinfo
+from messagemaker.profile import AirportProfile, cached_airport
+from messagemaker.singleflight import SingleFlight
+from messagemaker.state import SectionState
+from threading import Lock
+from contextvars import copy_context
+from messagemaker.vatsim import (StationPoller, airport_freqs, fetch_stations,
+    online_freqs)
+
+message_seconds = metrics.histogram(
+    'messagemaker_message_seconds',
+    'Time to make a message, upstream calls included')
+section_seconds = metrics.histogram(
+    'messagemaker_section_seconds',
+    'Time rendering each message section',
+    ('section',))
+parse_seconds = metrics.histogram(
+    'messagemaker_metar_parse_seconds',
+    'Time parsing METAR reports not parsed before')
+out_of_service = metrics.counter(
+    'messagemaker_out_of_service_total',
+    'Requests answered with [ATIS OUT OF SERVICE]')
 
 def message_try(metar,
                 rwy,
@@ -40,44 +65,24 @@ def message_try(metar,
                 rwy_35_clsd=False):
     response = None
     try:
-        response = message(
-            metar,
-            rwy,
-            letter,
-            airports,
-            tl_tbl,
-            show_freqs,
-            hiro,
-            xpndr_startup,
-            rwy_35_clsd)
+        with message_seconds.time():
+            response = message(
+                metar,
+                rwy,
+                letter,
+                airports,
+                tl_tbl,
+                show_freqs,
+                hiro,
+                xpndr_startup,
+                rwy_35_clsd)
     except Exception as crap:
         print(traceback.format_exc())
 
-    return '[ATIS OUT OF SERVICE]' if response is None else response
-
-def freq(airport, online_freqs, freq_type):
-    parts = airport[freq_type]
-    for freq, part in parts:
-        if freq in online_freqs:
-            return freq, part
-
-    return None, None
-
-def freqinfo(airport, online_freqs):
-    dep_freq, dep_msg = freq(airport, online_freqs, 'dep_freq')
-    clr_freq, clr_msg = freq(airport, online_freqs, 'clr_freq')
-    del_freq, _ = airport['clr_freq'][0]
-    parts = []
-
-    twr_online = True if airport['twr'] in online_freqs else False
-    if dep_freq is not None:
-        if dep_freq != clr_freq and twr_online:
-            parts.append(dep_msg)
-        parts.append(clr_msg)
-        return ' '.join(parts)
-    if clr_freq != del_freq and clr_msg is not None:
-        parts.append(clr_msg)
-        return ' '.join(parts)
+    if response is None:
+        out_of_service.inc()
+        return '[ATIS OUT OF SERVICE]'
+    return response
 
 def intro(letter, metar):
     template = '[$airport ATIS] [$letter] $time'
@@ -86,12 +91,6 @@ def intro(letter, metar):
         letter=letter,
         time='%02d%02d' % (metar.time.hour, metar.time.minute))
 
-def approach(rwy, airport):
-    template = '[EXP ${approach} APCH] [RWY IN USE ${rwy}]'
-    return Template(template).substitute(
-        rwy=rwy,
-        approach=airport['approaches'][rwy])
-
 def transition_level(airport, tl_tbl, metar):
     template = '[TL] %s'
     transition_alt = airport['transition_altitude']
@@ -101,14 +100,6 @@ def transition_level(airport, tl_tbl, metar):
     _, transition_level = tl_tbl[transition_alt][index]
     return template % transition_level
 
-def arrdep_info(airport, rwy):
-    if rwy not in airport['arrdep_info']:
-        return ''
-    parts = []
-    for rwy_message in airport['arrdep_info'][rwy]:
-        parts.append(rwy_message)
-    return ' '.join(parts)
-
 def wind(metar):
     report = metar.report.wind
     parts = []
@@ -271,65 +262,383 @@ def message(metar,
             xpndr_startup,
             rwy_35_clsd):
     if len(metar) == 4:
-        metar = download_metar(metar)
+        with tracing.span('metar'):
+            metar = metars.get(metar)
 
-    metar = metarparse(metar)
+    metar = parse_metar(metar)
     airport = airports[metar.location]
+    online = None
+    if show_freqs:
+        with tracing.span('onlinestations'):
+            online = onlinestations(metar.location, airport)
+
+    return compose(
+        metar,
+        rwy,
+        letter,
+        airport,
+        tl_tbl,
+        online,
+        hiro,
+        xpndr_startup,
+        rwy_35_clsd)
+
+async def message_async(metar,
+                        rwy,
+                        letter,
+                        airports,
+                        tl_tbl,
+                        show_freqs,
+                        hiro,
+                        xpndr_startup,
+                        rwy_35_clsd,
+                        executor=None):
+    """Same as message(), with the METAR download and the vatsim query
+    running concurrently on `executor`"""
+    loop = asyncio.get_event_loop()
+    if len(metar) == 4:
+        icao = metar
+        # upstream calls keep the request deadline
+        metar = loop.run_in_executor(
+            executor, copy_context().run, metars.get, icao)
+    else:
+        metar = parse_metar(metar)
+        icao = metar.location
+
+    online = nothing()
+    if show_freqs:
+        online = loop.run_in_executor(
+            executor, copy_context().run, onlinestations, icao, airports[icao])
+    metar, online = await asyncio.gather(resolved(metar), online)
+
+    if isinstance(metar, str):
+        metar = parse_metar(metar)
+
+    return compose(
+        metar,
+        rwy,
+        letter,
+        airports[metar.location],
+        tl_tbl,
+        online,
+        hiro,
+        xpndr_startup,
+        rwy_35_clsd)
+
+async def message_try_async(*args, **kwargs):
+    response = None
+    try:
+        with message_seconds.time():
+            response = await message_async(*args, **kwargs)
+    except Exception as crap:
+        print(traceback.format_exc())
+
+    if response is None:
+        out_of_service.inc()
+        return '[ATIS OUT OF SERVICE]'
+    return response
+
+async def nothing():
+    return None
+
+async def resolved(value):
+    if asyncio.isfuture(value):
+        return await value
+    return value
+
+def onlinestations(icao, airport):
+    """Online frequencies from the poller, falls back to asking vatsim
+
+    None when vatsim can not be reached, the message is then made without
+    frequency information rather than going out of service"""
+    if isinstance(airport, AirportProfile):
+        airport = airport.source
+    online = stations.online(icao)
+    if online is None:
+        try:
+            online = getonlinestations(airport)
+        except Exception as crap:
+            print(traceback.format_exc())
+            return None
+    return None if online is None else tuple(online)
+
+def onlinestations_many(icaos, airports):
+    """Online frequencies for many airports, with a single vatsim query for
+    all those not being polled"""
+    online = { icao: stations.online(icao) for icao in icaos }
+    missing = [icao for icao, freqs in online.items() if freqs is None]
+    if missing:
+        sources = { icao: airports[icao].source
+                    if isinstance(airports[icao], AirportProfile)
+                        else airports[icao] for icao in missing }
+        freqs = set(chain.from_iterable(
+            airport_freqs(airport) for airport in sources.values()))
+        try:
+            found = fetch_stations(freqs)
+        except Exception as crap:
+            print(traceback.format_exc())
+            found = None
+        for icao, airport in sources.items():
+            online[icao] = None if found is None \
+                else online_freqs(airport, found)
+    return online
+
+def message_batch(entries, airports, tl_tbl, executor):
+    """Messages for a list of (metar, rwy, letter, show_freqs, hiro,
+    xpndr_startup, rwy_35_clsd) entries
+
+    Each ICAO is downloaded once, vatsim is queried once for all airports,
+    and all upstream calls run concurrently on `executor`. A failing entry
+    is '[ATIS OUT OF SERVICE]' and does not affect the others, entries are
+    made without frequency information when vatsim can not be reached."""
+    start = time.perf_counter()
+    reports = {}
+    for metar, *_ in entries:
+        if len(metar) != 4 and metar not in reports:
+            reports[metar] = attempt(parse_metar, metar)
+    # upstream calls keep the request deadline
+    downloads = { metar: executor.submit(
+                    copy_context().run, metars.get, metar)
+                        for metar, *_ in entries if len(metar) == 4 }
+
+    icaos = set()
+    for metar, _, _, show_freqs, *_ in entries:
+        icao = metar if len(metar) == 4 else getattr(
+            reports[metar], 'location', None)
+        if show_freqs and icao in airports:
+            icaos.add(icao)
+    online = executor.submit(
+        copy_context().run, onlinestations_many, icaos, airports) \
+            if icaos else None
+
+    for metar, download in downloads.items():
+        reports[metar] = attempt(lambda: parse_metar(download.result()))
+    online = attempt(online.result) if online is not None else {}
+    if isinstance(online, Exception):
+        # messages are made without frequency information instead
+        online = {}
+    # each message waited for all upstream calls, and its own composing
+    fetched = time.perf_counter() - start
+
+    responses = []
+    for metar, rwy, letter, show_freqs, hiro, xpndr_startup, rwy_35_clsd \
+            in entries:
+        composing = time.perf_counter()
+        report = reports[metar]
+        response = None
+        if not isinstance(report, Exception):
+            response = attempt(lambda: compose(
+                report,
+                rwy,
+                letter,
+                airports[report.location],
+                tl_tbl,
+                online.get(report.location) if show_freqs else None,
+                hiro,
+                xpndr_startup,
+                rwy_35_clsd))
+        if response is None or isinstance(response, Exception):
+            out_of_service.inc()
+            response = '[ATIS OUT OF SERVICE]'
+        if metrics.ENABLED:
+            message_seconds.observe(
+                fetched + time.perf_counter() - composing)
+        responses.append(response)
+
+    return responses
+
+def attempt(func, *args):
+    """Result of `func`, or the exception it raised"""
+    try:
+        return func(*args)
+    except Exception as crap:
+        print(traceback.format_exc())
+        return crap
+
+def compose(metar,
+            rwy,
+            letter,
+            airport,
+            tl_tbl,
+            online_freqs,
+            hiro,
+            xpndr_startup,
+            rwy_35_clsd):
+    """Message text for a parsed `metar`, frequencies are only announced
+    when `online_freqs` is not None
+
+    The weather sections that changed from the previous report composed
+    with the same arguments are in the message `changed`."""
+    if not isinstance(airport, AirportProfile):
+        airport = cached_airport(metar.location, airport, tl_tbl)
     parts = []
 
     parts.append(intro(letter, metar))
     if ',' in rwy:
         rwy = rwy.split(',')[0]
-    parts.append(approach(rwy, airport))
-    parts.append(transition_level(airport, tl_tbl, metar))
-    if xpndr_startup and 'xpndr_startup' in airport:
-        parts.append(airport['xpndr_startup'])
-    if hiro and 'hiro' in airport:
-        parts.append(airport['hiro'])
-    if rwy_35_clsd and 'rwy_35_clsd' in airport:
-        parts.append(airport['rwy_35_clsd'])
-    if show_freqs:
-        part = freqinfo(airport, tuple(getonlinestations(airport)))
+    runway = airport.runways[rwy]
+    parts.append(runway.approach)
+    with section_seconds.time('weather_sections'), \
+            tracing.span('weather_sections'):
+        sections, changed = weather_sections(
+            airport,
+            metar,
+            (rwy, bool(hiro), bool(xpndr_startup), bool(rwy_35_clsd),
+                online_freqs is not None))
+    parts.append(sections['transition_level'])
+    if xpndr_startup and airport.xpndr_startup is not None:
+        parts.append(airport.xpndr_startup)
+    if hiro and airport.hiro is not None:
+        parts.append(airport.hiro)
+    if rwy_35_clsd and airport.rwy_35_clsd is not None:
+        parts.append(airport.rwy_35_clsd)
+    if online_freqs is not None:
+        with section_seconds.time('freqinfo'), tracing.span('freqinfo'):
+            part = airport.freqinfo(online_freqs)
         if part is not None:
             parts.append(part)
-    parts.append(arrdep_info(airport, rwy))
-    parts.append(wind(metar))
-    if metar.report.sky:
-        parts.append(weather(metar))
-    parts.append(sky(metar))
-    parts.append(temperature(metar))
-    parts.append(dewpoint(metar))
-    parts.append(qnh(metar))
+    parts.append(runway.arrdep_info)
+    parts.append(sections['wind'])
+    if sections['weather'] is not None:
+        parts.append(sections['weather'])
+    parts.append(sections['sky'])
+    parts.append(sections['temperature'])
+    parts.append(sections['dewpoint'])
+    parts.append(sections['qnh'])
 
     # general arrival and departure information
-    for general_info in airport['general_info']:
-        parts.append(general_info)
-
-    parts.append('[ACK %s INFO] [%s]' % (metar.location, letter))
-
-    return ' '.join(parts) if parts is not None else None
+    parts.extend(airport.general_info)
+
+    parts.append(airport.ack)
+    parts.append('[%s]' % letter)
+
+    return Message(parts, changed) if parts is not None else None
+
+class Message(str):
+    """Message text that also keeps the parts it was composed of, static
+    parts are the same text every time, and the names of the weather
+    sections that changed from the previous report"""
+
+    def __new__(cls, parts, changed=frozenset()):
+        message = super().__new__(cls, ' '.join(parts))
+        message.parts = tuple(parts)
+        message.changed = frozenset(changed)
+        return message
+
+## weather dependent sections
+# (name, inputs, render) of each, inputs are what the rendered text depends
+# on, the section is only rendered again when those change
+WEATHER_SECTIONS = (
+    ('transition_level',
+        lambda airport, metar: (airport.transition_levels,
+                                metar.report.pressure),
+        lambda airport, metar: airport.transition_level(metar)),
+    ('wind',
+        lambda airport, metar: metar.report.wind,
+        lambda airport, metar: wind(metar)),
+    ('weather',
+        # CAVOK has no sky at all, not the same as a sky without weather
+        lambda airport, metar: (bool(metar.report.sky),
+                                metar.report.sky and metar.report.sky.weather),
+        lambda airport, metar: weather(metar) if metar.report.sky else None),
+    ('sky',
+        lambda airport, metar: metar.report.sky,
+        lambda airport, metar: sky(metar)),
+    ('temperature',
+        lambda airport, metar: metar.report.temperature.air,
+        lambda airport, metar: temperature(metar)),
+    ('dewpoint',
+        lambda airport, metar: metar.report.temperature.dewpoint,
+        lambda airport, metar: dewpoint(metar)),
+    ('qnh',
+        lambda airport, metar: metar.report.pressure,
+        lambda airport, metar: qnh(metar)),
+)
+
+def timed_section(name, render):
+    def timed(*args):
+        with section_seconds.time(name), tracing.span(name):
+            return render(*args)
+    return timed
+
+# sections are timed whenever they are actually rendered
+WEATHER_SECTIONS = tuple((name, inputs, timed_section(name, render))
+                            for name, inputs, render in WEATHER_SECTIONS)
+
+atis_states = {}
+atis_states_lock = Lock()
+
+def atis_state(key):
+    """Weather sections state of an ATIS, one for each airport and the
+    request arguments besides the report and letter"""
+    state = atis_states.get(key)
+    if state is None:
+        with atis_states_lock:
+            state = atis_states.setdefault(key, SectionState(WEATHER_SECTIONS))
+    return state
+
+def weather_sections(airport, metar, key=()):
+    """Rendered weather sections for `metar`, and the names of those that
+    changed from the previous report of the same airport and `key`"""
+    return atis_state((airport.icao, *key)).update(airport, metar)
+
+def parse_metar(metar):
+    """metarparse() memoized on the raw report, which is the same for every
+    request until a new one is issued"""
+    report = parsed_metars.get(metar)
+    if report is None:
+        with parse_seconds.time(), tracing.span('parse'):
+            report = metarparse(metar)
+        parsed_metars.set(metar, report)
+    return report
+
+parsed_metars = Cache(maxsize=256)
+
+# caches reported on /metrics, the app adds its own
+caches = { 'parsed_metars': parsed_metars }
+metrics.collected(
+    'messagemaker_cache_hits_total',
+    'Cache lookups answered from the cache',
+    ('cache',),
+    lambda: { (name,): cache.hits for name, cache in caches.items() })
+metrics.collected(
+    'messagemaker_cache_misses_total',
+    'Cache lookups not in the cache',
+    ('cache',),
+    lambda: { (name,): cache.misses for name, cache in caches.items() })
+
+AVWX_URL = 'https://avwx.rest/api/metar'
+# of the request deadline left, the rest is kept for the vatsim query
+AVWX_SHARE = 0.7
 
 def download_metar(icao):
-    return requests.get(
-        'https://avwx.rest/api/metar/%s' % icao).json()['Raw-Report']
+    return client.get(
+        '%s/%s' % (AVWX_URL, icao),
+        upstream='avwx',
+        share=AVWX_SHARE).json()['Raw-Report']
+
+metars = MetarCache(download_metar)
 
 def getonlinestations(airport):
     """Returns all vatsim frequencies online at
     a given airport"""
 
-    freqs = tuple(chain(airport['clr_freq'], airport['dep_freq']))
-    freqs = { '{:0<7}'.format(freq) for freq, _ in freqs }
+    # concurrent requests for the same airport make a single query
+    freqs = frozenset(airport_freqs(airport))
+    stations = vatsim_queries.do(freqs, fetch_stations, freqs)
+    if stations is None:
+        return None
 
-    where = ','.join(('{"frequency":"%s"}' % freq for freq in freqs))
-    url = 'https://vatsim-status-proxy.herokuapp.com/clients?\
-where={"$or":[%s]}' % where
+    return online_freqs(airport, stations)
 
-    response = requests.get(url)
-    if response.status_code != 200:
-        return ()
+vatsim_queries = SingleFlight()
 
-    stations = json.loads(response.text)['_items']
+# concurrent upstream calls answered by one in flight, the app adds its own
+flights = { 'avwx': metars.flight, 'vatsim': vatsim_queries }
+metrics.collected(
+    'messagemaker_coalesced_total',
+    'Calls that waited on an identical one in flight instead',
+    ('flight',),
+    lambda: { (name,): flight.shared for name, flight in flights.items() })
 
-    return (station['frequency'] for station in stations
-                for callsign in airport['callsigns']
-                    if callsign in station['callsign'])
+stations = StationPoller()
@@ -0,0 +1,89 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Lock, Thread
+from messagemaker.singleflight import SingleFlight
+import time
+import traceback
+
+class MetarCache:
+    """Per ICAO cache of raw METAR reports
+
+    A report older than `max_age` seconds is still served, but triggers a
+    refresh in the background. When the refresh fails the last good report
+    is kept. Only the very first requests for an airport wait on `fetch`,
+    all on the same call. `listeners` are called with the ICAO whenever a
+    new report replaces another."""
+
+    def __init__(self, fetch, max_age=300, clock=time.monotonic):
+        self.fetch = fetch
+        self.max_age = max_age
+        self.clock = clock
+        self.failures = 0
+        self._reports = {}
+        self._refreshing = set()
+        self._lock = Lock()
+        self.flight = SingleFlight()
+        self.listeners = []
+
+    def get(self, icao):
+        with self._lock:
+            entry = self._reports.get(icao)
+            if entry is not None:
+                report, fetched = entry
+                if self.clock() - fetched >= self.max_age \
+                        and icao not in self._refreshing:
+                    self._refreshing.add(icao)
+                    Thread(target=self.refresh, args=(icao,), daemon=True).start()
+                return report
+
+        # nothing to serve yet, the request has to wait
+        return self.flight.do(icao, self.first_fetch, icao)
+
+    def first_fetch(self, icao):
+        with self._lock:
+            entry = self._reports.get(icao)
+        if entry is not None:
+            # fetched while this request was on its way
+            report, _ = entry
+            return report
+        report = self.fetch(icao)
+        self.put(icao, report)
+        return report
+
+    def put(self, icao, report):
+        with self._lock:
+            previous = self._reports.get(icao)
+            self._reports[icao] = (report, self.clock())
+        if previous is not None and previous[0] != report:
+            for listener in self.listeners:
+                listener(icao)
+
+    def refresh(self, icao):
+        try:
+            self.put(icao, self.fetch(icao))
+        except Exception:
+            # keep serving the last good report
+            self.failures += 1
+            print(traceback.format_exc())
+        finally:
+            with self._lock:
+                self._refreshing.discard(icao)
@@ -0,0 +1,148 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## counters and latency histograms, in Prometheus text format
+# recording is a lock and an addition, the text is only rendered when
+# scraped. set ENABLED to False to stop timing altogether
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+import time
+
+ENABLED = True
+
+# seconds, from a cached section to a slow upstream
+BUCKETS = (.0001, .0005, .001, .005, .01, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+METRICS = []
+
+class Counter:
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labels, labels)), value
+
+class Histogram:
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        if not ENABLED:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        with self._lock:
+            values = { labels: (list(counts), total)
+                        for labels, (counts, total) in self.values.items() }
+        for labels, (counts, total) in sorted(values.items()):
+            names = dict(zip(self.labels, labels))
+            count = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                count += bucket
+                yield self.name + '_bucket', dict(names, le=str(bound)), count
+            yield self.name + '_sum', names, total
+            yield self.name + '_count', names, count
+
+class Collected:
+    """Values read from elsewhere when scraped, `collect` returns a
+    {label values: value} dict"""
+
+    def __init__(self, name, help, labels, collect, type='counter'):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+        self.type = type
+
+    def samples(self):
+        for labels, value in sorted(self.collect().items()):
+            yield self.name, dict(zip(self.labels, labels)), value
+
+def register(metric):
+    METRICS.append(metric)
+    return metric
+
+def counter(name, help, labels=()):
+    return register(Counter(name, help, labels))
+
+def histogram(name, help, labels=(), buckets=BUCKETS):
+    return register(Histogram(name, help, labels, buckets))
+
+def collected(name, help, labels, collect, type='counter'):
+    return register(Collected(name, help, labels, collect, type))
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n') \
+        .replace('"', r'\"')
+
+def render(metrics=None):
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS if metrics is None else metrics:
+        lines.append('# HELP %s %s' % (metric.name, metric.help))
+        lines.append('# TYPE %s %s' % (metric.name, metric.type))
+        for name, labels, value in metric.samples():
+            if labels:
+                name = '%s{%s}' % (name, ','.join(
+                    '%s="%s"' % (label, escape(text))
+                        for label, text in labels.items()))
+            lines.append('%s %s' % (name, repr(float(value))
+                if isinstance(value, float) else value))
+    return '\n'.join(lines) + '\n'
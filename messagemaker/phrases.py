@@ -0,0 +1,157 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from array import array
+
+class PhraseIndex:
+    """Resolves messages to clip ids
+
+    Bracket phrases, as in [RWY IN USE 03], are looked up on a trie of the
+    clip names while the message is read, brace numbers, as in {1800}, are
+    said in thousands and hundreds, and any other digit is said alone. The
+    whole message is resolved in a single pass."""
+
+    END = ''
+
+    def __init__(self, names):
+        self.names = tuple(sorted(names))
+        self.ids = { name: id for id, name in enumerate(self.names) }
+        self.trie = {}
+        for id, name in enumerate(self.names):
+            node = self.trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[self.END] = id
+        self.missing = set()
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def resolve(self, message):
+        """Clip ids for `message`, phrases without a clip are left out and
+        remembered in `missing`, as are braces not holding a number"""
+        ids = array('H')
+        end = len(message)
+        i = 0
+        while i < end:
+            char = message[i]
+            if char == '[':
+                i = self.phrase(message, i + 1, ids)
+            elif char == '{':
+                close = message.find('}', i)
+                if close < 0:
+                    # never closed, not said
+                    self.missing.add(message[i:])
+                    break
+                self.number(message[i + 1:close], ids)
+                i = close + 1
+            elif '0' <= char <= '9':
+                self.clip(char, ids)
+                i += 1
+            else:
+                i += 1
+        return ids
+
+    def phrase(self, message, start, ids):
+        node = self.trie
+        i = start
+        end = len(message)
+        while i < end and message[i] != ']':
+            node = node.get(message[i]) if node is not None else None
+            i += 1
+        if node is not None and self.END in node:
+            ids.append(node[self.END])
+        else:
+            self.missing.add(message[start:i])
+        return i + 1
+
+    def number(self, number, ids):
+        # braces may come from request arguments, as the letter
+        if not (number.isascii() and number.isdigit()):
+            self.missing.add('{%s}' % number)
+            return
+        for name in spoken_number(number):
+            self.clip(name, ids)
+
+    def clip(self, name, ids):
+        id = self.ids.get(name)
+        if id is None:
+            self.missing.add(name)
+        else:
+            ids.append(id)
+
+    def validate(self, phrases):
+        """Phrases, from any message part, that have no clip"""
+        missing = set()
+        for text in phrases:
+            for phrase in bracket_phrases(text):
+                if phrase not in self.ids:
+                    missing.add(phrase)
+        return sorted(missing)
+
+def bracket_phrases(text):
+    start = text.find('[')
+    while start > -1:
+        end = text.find(']', start)
+        if end < 0:
+            break
+        yield text[start + 1:end]
+        start = text.find('[', end)
+
+def spoken_number(number):
+    """Clip names for a number said in thousands and hundreds, as in
+    {1800} said as one thousand eight hundred"""
+    number = int(number)
+    if number == 0:
+        return ['0']
+    names = []
+    thousands, rest = divmod(number, 1000)
+    hundreds, rest = divmod(rest, 100)
+    if thousands:
+        names.extend(str(thousands))
+        names.append('thousand')
+    if hundreds:
+        names.append(str(hundreds))
+        names.append('hundred')
+    if rest:
+        names.extend(str(rest))
+    return names
+
+def airport_phrases(icao, airport):
+    """Every message part an airport may announce"""
+    yield '[%s ATIS]' % icao
+    yield '[ACK %s INFO]' % icao
+    for rwy, approach in airport['approaches'].items():
+        yield '[EXP %s APCH]' % approach
+        yield '[RWY IN USE %s]' % rwy
+    for messages in airport['arrdep_info'].values():
+        yield from messages
+    yield from airport['general_info']
+    for _, message in airport['clr_freq']:
+        yield message
+    for _, message in airport['dep_freq']:
+        yield message
+    for notice in ('hiro', 'xpndr_startup', 'rwy_35_clsd'):
+        if notice in airport:
+            yield airport[notice]
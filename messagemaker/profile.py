@@ -0,0 +1,127 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import chain
+from types import MappingProxyType
+from messagemaker.airport import approach, arrdep_info, freqinfo
+from messagemaker.cache import Cache
+
+_missing = object()
+
+RunwayProfile = namedtuple('RunwayProfile', ('approach', 'arrdep_info'))
+
+class AirportProfile(namedtuple('AirportProfile', (
+        'icao',
+        'runways',
+        'transition_levels',
+        'xpndr_startup',
+        'hiro',
+        'rwy_35_clsd',
+        'freqs',
+        'freq_messages',
+        'general_info',
+        'ack',
+        'source'))):
+    """Airport settings compiled once, with every part of the message that
+    depends only on the airport and runway already rendered
+
+    The frequency information is rendered the first time each set of
+    online frequencies is seen, and kept in `freq_messages`."""
+
+    __slots__ = ()
+
+    def transition_level(self, metar):
+        index = bisect_right(
+            self.transition_levels,
+            (float(metar.report.pressure),))
+        _, transition_level = self.transition_levels[index]
+        return '[TL] %s' % transition_level
+
+    def static_parts(self):
+        """Every message part that is the same text on every message"""
+        for runway in self.runways.values():
+            yield runway.approach
+            yield runway.arrdep_info
+        for notice in (self.xpndr_startup, self.hiro, self.rwy_35_clsd):
+            if notice is not None:
+                yield notice
+        # every frequency information said, one message or two joined
+        clr = [message for _, message in self.source['clr_freq']]
+        dep = [message for _, message in self.source['dep_freq']]
+        yield from clr
+        yield from dep
+        for dep_message in dep:
+            for clr_message in clr:
+                yield '%s %s' % (dep_message, clr_message)
+        yield from self.general_info
+        yield self.ack
+
+    def freqinfo(self, online_freqs):
+        online = self.freqs.intersection(online_freqs)
+        message = self.freq_messages.get(online, _missing)
+        if message is _missing:
+            # failures are not kept, they raise from freqinfo every time
+            message = freqinfo(self.source, online)
+            self.freq_messages[online] = message
+        return message
+
+def compile_airport(icao, airport, tl_tbl):
+    runways = { rwy: RunwayProfile(
+                    approach(rwy, airport),
+                    arrdep_info(airport, rwy))
+                for rwy in airport['approaches'] }
+
+    freqs = frozenset(chain(
+        (freq for freq, _ in airport['clr_freq']),
+        (freq for freq, _ in airport['dep_freq']),
+        (airport['twr'],)))
+
+    return AirportProfile(
+        icao=icao,
+        runways=MappingProxyType(runways),
+        transition_levels=tuple(tl_tbl[airport['transition_altitude']]),
+        xpndr_startup=airport.get('xpndr_startup'),
+        hiro=airport.get('hiro'),
+        rwy_35_clsd=airport.get('rwy_35_clsd'),
+        freqs=freqs,
+        freq_messages={},
+        general_info=tuple(airport['general_info']),
+        ack='[ACK %s INFO]' % icao,
+        source=MappingProxyType(airport))
+
+def compile_airports(airports, tl_tbl):
+    return MappingProxyType({ icao: compile_airport(icao, airport, tl_tbl)
+                                for icao, airport in airports.items() })
+
+compiled_airports = Cache(maxsize=64)
+
+def cached_airport(icao, airport, tl_tbl):
+    """compile_airport() once for the same settings, which are not
+    expected to change once loaded"""
+    key = (icao, id(airport), id(tl_tbl))
+    entry = compiled_airports.get(key)
+    # the settings are kept with the profile, so their ids are not reused
+    if entry is None or entry[0] is not airport or entry[1] is not tl_tbl:
+        entry = (airport, tl_tbl, compile_airport(icao, airport, tl_tbl))
+        compiled_airports.set(key, entry)
+    return entry[2]
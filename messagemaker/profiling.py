@@ -0,0 +1,165 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## on demand profiling of live requests
+# a request runs either under cProfile, returned as pstats or its text, or
+# under a sampler of the request thread stack, returned as collapsed stacks
+# for flamegraphs. only one request is profiled at a time, and only on
+# thread workers: gevent workers run many requests on a single thread, where
+# neither the sampler nor cProfile can tell them apart
+from collections import Counter
+from io import StringIO
+from threading import Event, Lock, Thread, get_ident
+import cProfile
+import marshal
+import pstats
+import sys
+import time
+
+FORMATS = ('collapsed', 'pstats', 'text')
+SAMPLE_INTERVAL = 0.001 # seconds
+
+_busy = Lock()
+
+def supported():
+    """Whether requests run on threads of their own"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is None or not monkey.is_module_patched('threading')
+
+class Sampler:
+    """Counts the stacks a thread is seen running every `interval`"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+            time.sleep(self.interval)
+
+def collapse(frame):
+    """Stack of `frame` as 'outermost;..;innermost' function names"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s:%s' % (code.co_filename, code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class Profile:
+    """Profile of the requests run between start() and stop()"""
+
+    def __init__(self, format='collapsed'):
+        if format not in FORMATS:
+            raise ValueError('unknown profile format %s' % format)
+        self.format = format
+        self.stacks = Counter()
+        self.stats = None
+        self._running = None
+
+    def start(self):
+        """False when another request is being profiled, or requests can
+        not be profiled at all"""
+        if not supported() or not _busy.acquire(blocking=False):
+            return False
+        if self.format == 'collapsed':
+            self._running = Sampler(get_ident())
+            self._running.start()
+        else:
+            self._running = cProfile.Profile()
+            self._running.enable()
+        return True
+
+    def stop(self):
+        running, self._running = self._running, None
+        try:
+            if self.format == 'collapsed':
+                running.stop()
+                self.stacks.update(running.stacks)
+            else:
+                running.disable()
+                if self.stats is None:
+                    self.stats = pstats.Stats(running)
+                else:
+                    self.stats.add(running)
+        finally:
+            _busy.release()
+
+    def output(self):
+        """(body, mimetype) of the profile"""
+        # not while a request is adding to it
+        with _busy:
+            return self._output()
+
+    def _output(self):
+        if self.format == 'collapsed':
+            return ''.join('%s %d\n' % (stack, count)
+                    for stack, count in sorted(self.stacks.items())), \
+                'text/plain'
+        if self.stats is None:
+            return b'' if self.format == 'pstats' else '', 'text/plain'
+        if self.format == 'pstats':
+            # the same as pstats.Stats.dump_stats() writes
+            return marshal.dumps(self.stats.stats), 'application/octet-stream'
+        text = StringIO()
+        self.stats.stream = text
+        self.stats.sort_stats('cumulative').print_stats(50)
+        return text.getvalue(), 'text/plain'
+
+class Armed:
+    """Profiles the next `count` requests into a single profile"""
+
+    def __init__(self):
+        self.remaining = 0
+        self.profile = None
+        self._lock = Lock()
+
+    def arm(self, count, format='collapsed'):
+        with self._lock:
+            self.profile = Profile(format)
+            self.remaining = count
+
+    def take(self):
+        """The started profile when the current request is one to profile,
+        None otherwise"""
+        if not self.remaining:
+            return None
+        with self._lock:
+            if self.remaining <= 0 or not self.profile.start():
+                return None
+            self.remaining -= 1
+            return self.profile
+
+armed = Armed()
@@ -0,0 +1,147 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from queue import Queue, Empty, Full
+from threading import Event, Lock, Thread
+import traceback
+
+class Subscription:
+    """Messages pushed to one client, iterating yields None every
+    `keepalive` seconds without a new message"""
+
+    def __init__(self, publisher, topic, keepalive=15):
+        self.publisher = publisher
+        self.topic = topic
+        self.keepalive = keepalive
+        self.queue = Queue(maxsize=8)
+
+    def push(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except Full:
+            # a slow client only needs the latest message
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                pass
+            self.queue.put_nowait(message)
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.queue.get(timeout=self.keepalive)
+            except Empty:
+                yield None
+
+    def close(self):
+        self.publisher.unsubscribe(self)
+
+class Topic:
+
+    def __init__(self, key, args):
+        self.key = key
+        self.args = args
+        self.message = None
+        self.version = None
+        self.subscriptions = set()
+
+class Publisher:
+    """Renders each subscribed message and pushes it to all of its
+    subscribers when the text changes
+
+    Every `interval` seconds, or when woken, `version` is called with the
+    topic arguments. A topic is only rendered again when its version
+    differs, without `version` it is rendered every time."""
+
+    def __init__(self, render, interval=15, version=None):
+        self.render = render
+        self.interval = interval
+        self.version = version
+        self.renders = 0
+        self.topics = {}
+        self._lock = Lock()
+        self._wake = Event()
+        self._thread = None
+
+    def subscribe(self, key, args, keepalive=15):
+        with self._lock:
+            topic = self.topics.get(key)
+            if topic is None:
+                topic = self.topics[key] = Topic(key, args)
+            subscription = Subscription(self, topic, keepalive)
+            topic.subscriptions.add(subscription)
+            started = self._thread is None or not self._thread.is_alive()
+            if started:
+                self._thread = Thread(target=self.run, daemon=True)
+                self._thread.start()
+
+        if topic.message is not None:
+            subscription.push(topic.message)
+        elif not started:
+            # new topic, render it right away
+            self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            topic = subscription.topic
+            topic.subscriptions.discard(subscription)
+            if not topic.subscriptions:
+                self.topics.pop(topic.key, None)
+
+    def run(self):
+        while True:
+            with self._lock:
+                topics = list(self.topics.values())
+            if not topics:
+                with self._lock:
+                    if not self.topics:
+                        self._thread = None
+                        return
+            self._wake.clear()
+            for topic in topics:
+                self.publish(topic)
+            self._wake.wait(self.interval)
+
+    def wake(self):
+        """Checks the topics right away, instead of at the next interval"""
+        self._wake.set()
+
+    def publish(self, topic):
+        try:
+            version = None
+            if self.version is not None:
+                version = self.version(*topic.args)
+                if topic.message is not None and version == topic.version:
+                    return
+            message = self.render(*topic.args)
+        except Exception:
+            print(traceback.format_exc())
+            return
+        self.renders += 1
+        topic.version = version
+        if message == topic.message:
+            return
+        topic.message = message
+        with self._lock:
+            subscriptions = list(topic.subscriptions)
+        for subscription in subscriptions:
+            subscription.push(message)
@@ -0,0 +1,64 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## silence handling of the clip catalogue
+# clips are trimmed once, when packed or loaded, and short gaps of silence
+# are said between clips instead
+import numpy as np
+from messagemaker.audio import RATE, read_clip
+from messagemaker.formats import WAVE_FORMAT_ALAW, WAVE_FORMAT_MULAW, alaw, ulaw
+
+THRESHOLD = 500 # peak amplitude, about -36 dBFS
+WINDOW = 10 # ms
+PADDING = 20 # ms of the original silence kept on each end
+
+def trim(frames, rate=RATE, threshold=THRESHOLD, window=WINDOW, padding=PADDING):
+    """16 bit PCM without its leading and trailing silence
+
+    The clip is split in windows, silence is every window at either end
+    whose peak is below `threshold`."""
+    samples = np.frombuffer(frames, dtype='<i2')
+    size = max(1, rate * window // 1000)
+    count = len(samples) // size
+    if count == 0:
+        return frames
+
+    peaks = np.abs(samples[:count * size].reshape(count, size).astype(np.int32))
+    loud = np.flatnonzero(peaks.max(axis=1) > threshold)
+    if len(loud) == 0:
+        return frames
+
+    padding = rate * padding // 1000
+    start = max(0, loud[0] * size - padding)
+    end = min(len(samples), (loud[-1] + 1) * size + padding)
+    return samples[start:end].tobytes()
+
+def read_trimmed(filename):
+    return trim(read_clip(filename))
+
+def silence(format, ms):
+    """`ms` of silence in `format`"""
+    samples = np.zeros(format.rate * ms // 1000, dtype=np.int32)
+    if format.tag == WAVE_FORMAT_MULAW:
+        return ulaw(samples).tobytes()
+    if format.tag == WAVE_FORMAT_ALAW:
+        return alaw(samples).tobytes()
+    return samples.astype('<i%d' % format.width).tobytes()
@@ -0,0 +1,88 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Event, Lock
+from messagemaker import client
+import copy
+
+class Call:
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key
+
+    While a call for a key is in flight, other calls for that key wait on
+    it and get its result, or a copy of its exception raised, instead of
+    calling again. They wait no longer than their own deadline. A call made
+    after it returned calls again."""
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._calls = {}
+        self._lock = Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Call()
+                self.calls += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            left = client.remaining()
+            if not call.done.wait(None if left is None else max(left, 0)):
+                raise client.DeadlineExceeded(
+                    'no time left waiting on %r' % (key,))
+            if call.error is not None:
+                reraise(call.error)
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as crap:
+            call.error = crap
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+def reraise(error):
+    """Raises a copy of `error`, each waiter with its own traceback"""
+    try:
+        copied = copy.copy(error)
+    except Exception:
+        copied = None
+    if copied is None:
+        raise error
+    raise copied from error
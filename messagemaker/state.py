@@ -0,0 +1,59 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Lock
+
+class SectionState:
+    """Last inputs and rendered text of a set of message sections
+
+    `sections` are (name, inputs, render) triples, both called with the
+    same arguments given to update(). A section is only rendered again
+    when its inputs compare different from the previous update.
+
+    The changed sections are those that differed from the inputs before
+    the current ones, and are reported the same for as long as the inputs
+    stay the same."""
+
+    def __init__(self, sections):
+        self.sections = sections
+        self.inputs = {}
+        self.rendered = {}
+        self.changed = frozenset()
+        self.renders = 0
+        self._lock = Lock()
+
+    def update(self, *args):
+        """Rendered sections and the names of those that changed"""
+        with self._lock:
+            values = [(name, inputs(*args), render)
+                        for name, inputs, render in self.sections]
+            changed = { name for name, value, _ in values
+                        if name not in self.inputs or
+                            self.inputs[name] != value }
+            if not changed:
+                return dict(self.rendered), self.changed
+            for name, value, render in values:
+                if name in changed:
+                    self.rendered[name] = render(*args)
+                    self.inputs[name] = value
+                    self.renders += 1
+            self.changed = frozenset(changed)
+            return dict(self.rendered), self.changed
@@ -0,0 +1,136 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## per request traces
+# a sampled request gets a trace id and records the duration of every span
+# it goes through. finished traces are kept in a ring buffer, and written
+# as JSON lines to a rotating file when one is configured
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from threading import Lock
+import json
+import logging
+import os
+import random
+import time
+
+SAMPLE_RATE = 0.0 # of requests traced
+
+_current = ContextVar('trace', default=None)
+
+class Trace:
+
+    def __init__(self, name, attrs=None):
+        self.id = os.urandom(8).hex()
+        self.name = name
+        self.attrs = dict(attrs or {})
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+
+    def record(self, name, start, duration):
+        self.spans.append({
+            'name': name,
+            'start_ms': round((start - self.start) * 1000, 3),
+            'duration_ms': round(duration * 1000, 3),
+        })
+
+    def to_dict(self):
+        return {
+            'trace_id': self.id,
+            'name': self.name,
+            'attrs': self.attrs,
+            'started': self.started,
+            'duration_ms': round(self.duration * 1000, 3),
+            'spans': self.spans,
+        }
+
+class Traces:
+    """Last `size` finished traces, also logged to `path` when given"""
+
+    def __init__(self, size=256, path=None, max_bytes=10 << 20, backups=3):
+        self._traces = deque(maxlen=size)
+        self._lock = Lock()
+        self.log = None
+        if path is not None:
+            self.log = logging.getLogger('messagemaker.traces.%s' % path)
+            self.log.propagate = False
+            self.log.setLevel(logging.INFO)
+            self.log.addHandler(RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups))
+
+    def add(self, trace):
+        trace = trace.to_dict()
+        with self._lock:
+            self._traces.append(trace)
+        if self.log is not None:
+            self.log.info(json.dumps(trace))
+
+    def query(self, min_ms=0, limit=None, trace_id=None):
+        """Most recent first"""
+        with self._lock:
+            traces = list(self._traces)
+        traces = [trace for trace in reversed(traces)
+                    if trace['duration_ms'] >= min_ms and
+                        (trace_id is None or trace['trace_id'] == trace_id)]
+        return traces if limit is None else traces[:limit]
+
+    def __len__(self):
+        return len(self._traces)
+
+traces = Traces()
+
+def start(name, attrs=None, sample_rate=None):
+    """Starts tracing the current request, None when it is not sampled"""
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate:
+        return None
+    trace = Trace(name, attrs)
+    trace.token = _current.set(trace)
+    return trace
+
+def finish(trace):
+    trace.duration = time.perf_counter() - trace.start
+    try:
+        _current.reset(trace.token)
+    except ValueError:
+        # finished from another context than it was started on
+        _current.set(None)
+    traces.add(trace)
+
+def current():
+    return _current.get()
+
+@contextmanager
+def span(name):
+    """Records the time spent in the block on the current trace, if any"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(name, start, time.perf_counter() - start)
@@ -0,0 +1,133 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of Message Maker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from itertools import chain
+from threading import Event, Lock, Thread
+from messagemaker import client
+import json
+import time
+import traceback
+
+VATSIM_URL = 'https://vatsim-status-proxy.herokuapp.com/clients'
+# polls that may fail before the last stations are no longer trusted
+MISSED_POLLS = 3
+
+def airport_freqs(airport):
+    """All frequencies an airport may announce, as reported by vatsim"""
+    freqs = chain(airport['clr_freq'], airport['dep_freq'])
+    return { '{:0<7}'.format(freq) for freq, _ in freqs }
+
+def fetch_stations(freqs, url=None):
+    """Returns the stations online on any of `freqs`, or None when the
+    proxy does not answer"""
+    where = ','.join(('{"frequency":"%s"}' % freq for freq in sorted(freqs)))
+    url = '%s?where={"$or":[%s]}' % (url or VATSIM_URL, where)
+
+    response = client.get(url, upstream='vatsim')
+    if response.status_code != 200:
+        return None
+
+    return json.loads(response.text)['_items']
+
+def online_freqs(airport, stations):
+    return tuple(station['frequency'] for station in stations
+                    for callsign in airport['callsigns']
+                        if callsign in station['callsign'])
+
+class StationPoller:
+    """Keeps the online stations for a set of airports in memory
+
+    A single query for all airports is made every `interval` seconds,
+    requests only ever read the last result. That result is dropped once
+    MISSED_POLLS polls in a row failed."""
+
+    def __init__(self, clock=time.monotonic):
+        self.airports = {}
+        self.index = {}
+        self.interval = 60
+        self.clock = clock
+        self.polls = 0
+        self.failures = 0
+        self.polled_at = None
+        self._online = {}
+        self._stop = Event()
+        self._thread = None
+        self._lock = Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, airports, url=None, interval=60):
+        self.airports = airports
+        self.url = url
+        self.interval = interval
+        self._stop.clear()
+        self._thread = Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                self.failures += 1
+                print(traceback.format_exc())
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        freqs = set(chain.from_iterable(
+            airport_freqs(airport) for airport in self.airports.values()))
+        stations = fetch_stations(freqs, self.url)
+        if stations is None:
+            # keep the last known stations, until they are too old
+            self.failures += 1
+            return
+
+        index = {}
+        for station in stations:
+            index.setdefault(station['frequency'], set()).add(
+                station['callsign'])
+        online = { icao: online_freqs(airport, stations)
+                    for icao, airport in self.airports.items() }
+
+        with self._lock:
+            self.index = { freq: frozenset(callsigns)
+                            for freq, callsigns in index.items() }
+            self._online = online
+            self.polled_at = self.clock()
+            self.polls += 1
+
+    def online(self, icao):
+        """Frequencies online at `icao`, None if the airport is not polled,
+        no poll completed yet or the last one is too old"""
+        polled_at = self.polled_at
+        if polled_at is None or \
+                self.clock() - polled_at > self.interval * MISSED_POLLS:
+            return None
+        return self._online.get(icao)
@@ -20,6 +20,7 @@ along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
 """
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import os
 
 LPPT = {
     'approaches': {
@@ -188,3 +189,71 @@ TRANSITION = {
         (9999, '80')
     ]
 }
+
+## response cache for the ATIS endpoint
+# set RESPONSE_CACHE=off on the environment to disable it
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', 'on') != 'off'
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 30 # seconds
+
+## avwx METAR API
+AVWX_URL = os.environ.get('AVWX_URL', 'https://avwx.rest/api/metar')
+
+## hot path timing, served on /metrics
+# set METRICS=off on the environment to stop timing
+METRICS_ENABLED = os.environ.get('METRICS', 'on') != 'off'
+
+## request tracing, a sample of requests records the time of every span
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.01'))
+# finished traces kept in memory, served on /admin/traces
+TRACE_BUFFER = 256
+# set TRACE_PATH to also write them to a rotating file, as JSON lines
+TRACE_PATH = os.environ.get('TRACE_PATH')
+TRACE_FILE_BYTES = 10 << 20
+
+## admin endpoints answer only requests with this token, as
+# 'Authorization: Bearer <token>', and are disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+## profiling of live requests through the admin endpoints, needs
+# ADMIN_TOKEN and PROFILING=on on the environment
+PROFILING_ENABLED = os.environ.get('PROFILING', 'off') == 'on'
+
+## upstream calls of a request share this many seconds, a slow avwx or
+# vatsim can not hold it for longer
+REQUEST_DEADLINE = 5 # seconds
+# of the deadline left, the avwx METAR download takes at most this part,
+# the rest is kept for the vatsim query
+AVWX_SHARE = 0.7
+# an upstream failing this many times in a row is not called again for
+BREAKER_FAILURES = 5
+BREAKER_RESET = 30 # seconds
+
+## METAR reports older than this are refreshed in the background
+METAR_MAX_AGE = 300 # seconds
+
+## vatsim online stations
+VATSIM_URL = os.environ.get(
+    'VATSIM_URL', 'https://vatsim-status-proxy.herokuapp.com/clients')
+# set to 0 to query vatsim on every request instead
+VATSIM_POLL_INTERVAL = 60 # seconds
+
+## the report of subscribed messages is checked every, they are only
+# rendered again when it changed
+PUSH_INTERVAL = 15 # seconds
+
+## voice ATIS clips
+AUDIO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audio')
+# packed clips, built with: python -m messagemaker.bank audio audio.bank
+AUDIO_BANK = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'audio.bank')
+
+# silence said between clips, which are trimmed of their own
+AUDIO_GAP = 40 # ms
+# voice ATIS output formats served, see messagemaker.formats
+AUDIO_FORMATS = ('pcm', 'pcm8k', 'ulaw', 'alaw')
+
+## rendered voice ATIS cache, set AUDIO_CACHE_PATH to also keep it on disk
+AUDIO_CACHE_BYTES = 32 << 20
+AUDIO_CACHE_PATH = os.environ.get('AUDIO_CACHE_PATH')
+AUDIO_CACHE_DISK_BYTES = 256 << 20
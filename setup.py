@@ -30,7 +30,8 @@ with open(path.join(here, 'README.md'), encoding='utf-8') as readme_file:
 
 requirements = [
     'metar',
-    'requests'
+    'requests',
+    'numpy'
 ]
 
 test_requirements = [
@@ -56,10 +57,9 @@ setup(
         'License :: OSI Approved :: GNU General Public License v2 (GPLv2)',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.7',
     ],
+    python_requires='>=3.7',
     test_suite='tests',
     tests_require=test_requirements,
 )
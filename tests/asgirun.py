@@ -0,0 +1,75 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+import asyncio
+from urllib.parse import urlencode
+
+from messagemaker.message import message
+import asgirun
+import settings
+
+def get(path, **args):
+    sent = []
+
+    async def receive():
+        return { 'type': 'http.request' }
+
+    async def send(event):
+        sent.append(event)
+
+    scope = {
+        'type': 'http',
+        'path': path,
+        'query_string': urlencode(args).encode('latin-1'),
+    }
+    asyncio.get_event_loop().run_until_complete(
+        asgirun.app(scope, receive, send))
+    start, body = sent
+    return start['status'], body['body'].decode('utf-8')
+
+class TestAsgiRun(unittest.TestCase):
+
+    def setUp(self):
+        asgirun.responses.clear()
+
+    def test_message(self):
+        metar = 'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016'
+        status, body = get(
+            '/', metar=metar, rwy='03', letter='A', show_freqs='', hiro='1')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, message(
+            metar,
+            '03',
+            'A',
+            settings.AIRPORTS,
+            settings.TRANSITION,
+            False,
+            True,
+            False,
+            False))
+
+    def test_wrong_usage(self):
+        self.assertEqual(get('/', rwy='03'), (200, 'wrong usage'))
+
+    def test_not_found(self):
+        status, _ = get('/nothing')
+        self.assertEqual(status, 404)
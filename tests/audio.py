@@ -0,0 +1,91 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from io import BytesIO
+import wave
+from ddt import ddt, data, unpack
+
+from messagemaker.audio import *
+import settings
+
+@ddt
+class TestAudio(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.clips = load_clips(settings.AUDIO_PATH)
+
+    def test_clips_share_format(self):
+        self.assertIn('RWY IN USE 03', self.clips)
+        # resampled from 44.1kHz, about the same duration
+        with wave.open(settings.AUDIO_PATH + '/Q.wav') as original:
+            duration = original.getnframes() / original.getframerate()
+        self.assertAlmostEqual(
+            len(self.clips['Q']) / SAMPLE_WIDTH / RATE, duration, places=2)
+
+    def test_read_clip_converts(self):
+        # a second of 8 bit stereo at twice the rate
+        clip = BytesIO()
+        with wave.open(clip, 'wb') as original:
+            original.setnchannels(2)
+            original.setsampwidth(1)
+            original.setframerate(RATE * 2)
+            original.writeframes(bytes((0xC0, 0x40)) * RATE * 2)
+        clip.seek(0)
+        frames = read_clip(clip)
+        self.assertEqual(len(frames), RATE * SAMPLE_WIDTH)
+        self.assertEqual(frames, b'\x00\x00' * RATE)
+
+    def test_render(self):
+        atis = render('[QNH] 1016 [HVY]', self.clips)
+        with wave.open(BytesIO(atis)) as output:
+            self.assertEqual(output.getframerate(), RATE)
+            self.assertEqual(output.getnchannels(), CHANNELS)
+            frames = output.readframes(output.getnframes())
+        self.assertEqual(frames, b''.join(
+            self.clips[name] for name in ('QNH', '1', '0', '1', '6')))
+
+    def test_render_segments(self):
+        class Composed(str):
+            parts = ('[LPPT ATIS] [A] 1800', '[EXP ILS APCH] [RWY IN USE 03]',
+                '[QNH] 1016', '[ACK LPPT INFO]', '[A]')
+        message = Composed(' '.join(Composed.parts))
+        segments = prerender(
+            ('[EXP ILS APCH] [RWY IN USE 03]', '[ACK LPPT INFO]'),
+            self.clips)
+        self.assertEqual(
+            render(message, self.clips, segments),
+            render(str(message), self.clips))
+        self.assertEqual(len(segments), 2)
+
+    def test_stream(self):
+        message = '[QNH] 1016 [TL] 50'
+        chunks = list(stream(message, self.clips))
+        self.assertEqual(len(chunks), 1 + 8)
+        self.assertEqual(b''.join(chunks), render(message, self.clips))
+
+    def test_stream_header_first(self):
+        message = '[QNH] 1016 [TL] 50'
+        chunks = stream(message, self.clips)
+        header = next(chunks)
+        self.assertEqual(header, render(message, self.clips)[:len(header)])
+        self.assertIs(next(chunks), self.clips['QNH'])
@@ -0,0 +1,112 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+import time
+
+from messagemaker.audio import load_clips
+from messagemaker.audiocache import AudioCache, audio_key, clips_digest
+from messagemaker.silence import read_trimmed
+import settings
+
+class TestAudioCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key_ignores_spacing(self):
+        self.assertEqual(
+            audio_key('[QNH] 1016  [TL] 50'),
+            audio_key(' [QNH] 1016 [TL] 50 '))
+        self.assertNotEqual(
+            audio_key('[QNH] 1016'),
+            audio_key('[QNH] 1016', 'ulaw'))
+
+    def test_clips_digest(self):
+        clips = load_clips(settings.AUDIO_PATH)
+        digest = clips_digest(clips)
+        self.assertEqual(clips_digest(load_clips(settings.AUDIO_PATH)), digest)
+        self.assertNotEqual(
+            clips_digest(load_clips(settings.AUDIO_PATH, read_trimmed)),
+            digest)
+        clips.gap = b'\0' * 16
+        self.assertNotEqual(clips_digest(clips), digest)
+
+    def test_memory_bounded_by_bytes(self):
+        cache = AudioCache(max_bytes=10)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.get('a')
+        cache.set('c', b'12345')
+        self.assertEqual(cache.get('a'), b'12345')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['memory_bytes'], 10)
+
+    def test_disk_tier(self):
+        cache = AudioCache(max_bytes=5, path=self.directory.name)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        self.assertEqual(cache.get('a'), b'12345')
+        self.assertEqual(cache.disk_hits, 1)
+
+        # survives restarts
+        cache = AudioCache(max_bytes=5, path=self.directory.name)
+        self.assertEqual(cache.get('b'), b'12345')
+
+    def test_disk_evicts_least_recently_used(self):
+        cache = AudioCache(
+            max_bytes=0, path=self.directory.name, max_disk_bytes=10)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.get('a')
+        cache.set('c', b'12345')
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)), ['a.wav', 'c.wav'])
+        self.assertIsNone(cache.get('b'))
+
+    def test_disk_written_before_published(self):
+        cache = AudioCache(max_bytes=0, path=self.directory.name)
+        data = b'1' * (1 << 20)
+        with ThreadPoolExecutor(8) as pool:
+            read = list(pool.map(
+                lambda i: cache.set('a', data) if i % 2 else cache.get('a'),
+                range(64)))
+        # readers either miss or get the whole file
+        for result in read:
+            self.assertIn(result, (None, data))
+        self.assertEqual(os.listdir(self.directory.name), ['a.wav'])
+
+    def test_old_partial_files_removed(self):
+        old = os.path.join(self.directory.name, 'old.partial')
+        new = os.path.join(self.directory.name, 'new.partial')
+        for filename in (old, new):
+            with open(filename, 'wb') as partial:
+                partial.write(b'12345')
+        os.utime(old, (time.time() - 3600,) * 2)
+        cache = AudioCache(path=self.directory.name)
+        self.assertEqual(os.listdir(self.directory.name), ['new.partial'])
+        self.assertEqual(cache.stats()['disk_bytes'], 0)
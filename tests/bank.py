@@ -0,0 +1,67 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import tempfile
+import numpy as np
+
+from messagemaker.audio import load_clips
+from messagemaker.bank import ALIGN, build_bank, load_bank
+from messagemaker.silence import read_trimmed
+import settings
+
+class TestBank(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.filename = os.path.join(cls.directory.name, 'audio.bank')
+        cls.count = build_bank(settings.AUDIO_PATH, cls.filename, processes=2)
+        cls.clips = load_clips(settings.AUDIO_PATH, read_trimmed)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_every_clip_packed(self):
+        bank = load_bank(self.filename)
+        self.assertEqual(self.count, len(self.clips.index))
+        self.assertEqual(bank.index.names, self.clips.index.names)
+        for name in self.clips.index.names:
+            self.assertEqual(bytes(bank[name]), self.clips[name], name)
+
+    def test_views_are_aligned(self):
+        bank = load_bank(self.filename)
+        self.assertIsInstance(bank['QNH'], memoryview)
+        base = address(bank['QNH'].obj)
+        for name in bank.index.names:
+            self.assertEqual((address(bank[name]) - base) % ALIGN, 0, name)
+
+    def test_not_a_bank(self):
+        filename = os.path.join(self.directory.name, 'other')
+        with open(filename, 'wb') as other:
+            other.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            load_bank(filename)
+
+def address(buffer):
+    return np.frombuffer(buffer, dtype=np.uint8).ctypes.data
@@ -0,0 +1,79 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+from messagemaker.breaker import CircuitBreaker
+from tests.cache import Clock
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.circuit = CircuitBreaker(failures=2, reset_timeout=30,
+            clock=self.clock)
+
+    def test_opens_after_failures(self):
+        self.circuit.failure()
+        self.assertTrue(self.circuit.allow())
+        self.circuit.failure()
+        self.assertFalse(self.circuit.allow())
+        self.assertEqual(self.circuit.state, 'open')
+        self.assertEqual(self.circuit.trips, 1)
+
+    def test_success_resets(self):
+        self.circuit.failure()
+        self.circuit.success()
+        self.circuit.failure()
+        self.assertTrue(self.circuit.allow())
+
+    def test_single_trial_after_timeout(self):
+        self.circuit.failure()
+        self.circuit.failure()
+        self.clock.now = 30
+        self.assertEqual(self.circuit.state, 'half-open')
+        self.assertTrue(self.circuit.allow())
+        self.assertFalse(self.circuit.allow())
+        self.circuit.success()
+        self.assertEqual(self.circuit.state, 'closed')
+        self.assertTrue(self.circuit.allow())
+
+    def test_failed_trial_opens_again(self):
+        self.circuit.failure()
+        self.circuit.failure()
+        self.clock.now = 30
+        self.assertTrue(self.circuit.allow())
+        self.circuit.failure()
+        self.assertFalse(self.circuit.allow())
+        self.clock.now = 59
+        self.assertFalse(self.circuit.allow())
+        self.clock.now = 60
+        self.assertTrue(self.circuit.allow())
+        self.assertEqual(self.circuit.trips, 1)
+
+    def test_cancelled_trial(self):
+        self.circuit.failure()
+        self.circuit.failure()
+        self.clock.now = 30
+        self.assertTrue(self.circuit.allow())
+        self.circuit.cancel()
+        self.assertEqual(self.circuit.state, 'half-open')
+        self.assertTrue(self.circuit.allow())
@@ -0,0 +1,156 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+from messagemaker import client
+from messagemaker.breaker import CircuitOpen
+import requests
+import time
+from tests.stubs import AvwxStub, VatsimStub
+import settings
+
+class TestClient(unittest.TestCase):
+
+    def setUp(self):
+        client.reset()
+        self.stub = VatsimStub().start()
+
+    def tearDown(self):
+        client.reset()
+        self.stub.stop()
+
+    def test_connection_reused(self):
+        url = self.stub.clients_url + '?where={"$or":[]}'
+        client.get(url)
+        client.get(url)
+        stats = client.stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['new'], 1)
+        self.assertEqual(stats['reused'], 1)
+
+    def test_retries_server_errors(self):
+        self.stub.status = 503
+        response = client.get(
+            self.stub.clients_url + '?where={"$or":[]}',
+            timeout=1)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.stub.requests, client.RETRIES + 1)
+
+    def test_upstream_metrics(self):
+        url = self.stub.clients_url + '?where={"$or":[]}'
+        failures = client.upstream_failures.values.get(('vatsim',), 0)
+        client.get(url, upstream='vatsim')
+        self.stub.status = 503
+        client.get(url, timeout=1, upstream='vatsim')
+        self.assertEqual(
+            client.upstream_failures.values[('vatsim',)], failures + 1)
+        counts, _ = client.upstream_seconds.values[('vatsim',)]
+        self.assertGreaterEqual(sum(counts), 2)
+
+    def test_deadline_bounds_slow_upstream(self):
+        self.stub.latency = 3
+        url = self.stub.clients_url + '?where={"$or":[]}'
+        started = time.monotonic()
+        with client.deadline(0.3):
+            with self.assertRaises(requests.RequestException):
+                client.get(url, upstream='vatsim')
+        # attempts and backoff share the deadline
+        self.assertLess(time.monotonic() - started, 0.3 + 0.05)
+        self.assertIsNone(client.remaining())
+
+    def test_deadline_exceeded(self):
+        with client.deadline(0):
+            with self.assertRaises(client.DeadlineExceeded):
+                client.get(self.stub.clients_url, upstream='vatsim')
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_circuit_opens(self):
+        self.stub.status = 503
+        url = self.stub.clients_url + '?where={"$or":[]}'
+        client.BREAKER_FAILURES, failures = 2, client.BREAKER_FAILURES
+        try:
+            client.get(url, timeout=1, upstream='vatsim')
+            client.get(url, timeout=1, upstream='vatsim')
+            requests = self.stub.requests
+            with self.assertRaises(CircuitOpen):
+                client.get(url, timeout=1, upstream='vatsim')
+            self.assertEqual(self.stub.requests, requests)
+            # other upstreams are still called
+            client.get(url, timeout=1, upstream='avwx')
+        finally:
+            client.BREAKER_FAILURES = failures
+
+    def test_hung_upstream_opens_circuit(self):
+        # the slow first upstream leaves vatsim little time, avwx is the
+        # one to blame
+        avwx = AvwxStub({ 'LPPT': 'LPPT 191800Z CAVOK' }, latency=2).start()
+        self.stub.latency = 1
+        url = self.stub.clients_url + '?where={"$or":[]}'
+        client.BREAKER_FAILURES, failures = 2, client.BREAKER_FAILURES
+        try:
+            for _ in range(client.BREAKER_FAILURES):
+                with client.deadline(settings.REQUEST_DEADLINE):
+                    with self.assertRaises(requests.Timeout):
+                        client.get(avwx.metar_url + '/LPPT',
+                            upstream='avwx', share=settings.AVWX_SHARE)
+                    with self.assertRaises(requests.Timeout):
+                        client.get(url, upstream='vatsim')
+            self.assertEqual(client.breaker('avwx').state, 'open')
+            self.assertEqual(client.breaker('vatsim').state, 'closed')
+
+            # with avwx failing fast, vatsim has the time it needs
+            with client.deadline(settings.REQUEST_DEADLINE):
+                with self.assertRaises(CircuitOpen):
+                    client.get(avwx.metar_url + '/LPPT',
+                        upstream='avwx', share=settings.AVWX_SHARE)
+                self.assertEqual(client.get(url, upstream='vatsim').status_code,
+                    200)
+        finally:
+            client.BREAKER_FAILURES = failures
+            avwx.stop()
+
+    def test_retries_keep_to_deadline(self):
+        self.stub.status = 503
+        self.stub.headers['Retry-After'] = '3'
+        url = self.stub.clients_url + '?where={"$or":[]}'
+        started = time.monotonic()
+        with client.deadline(1):
+            response = client.get(url, upstream='vatsim')
+        self.assertEqual(response.status_code, 503)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.stub.requests, client.RETRIES + 1)
+
+    def test_single_session(self):
+        self.assertIs(client.session(), client.session())
+
+    def test_retries_failing_upstream(self):
+        avwx = AvwxStub({ 'LPPT': 'LPPT 191800Z CAVOK' }, error_rate=1).start()
+        try:
+            response = client.get(avwx.metar_url + '/LPPT', timeout=1)
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(avwx.requests, client.RETRIES + 1)
+
+            avwx.error_rate = 0
+            response = client.get(avwx.metar_url + '/LPPT', timeout=1)
+            self.assertEqual(response.json()['Raw-Report'], 'LPPT 191800Z CAVOK')
+        finally:
+            avwx.stop()
@@ -0,0 +1,165 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import mock
+
+from messagemaker import profiling, tracing
+from messagemaker.message import message
+import flaskrun
+import settings
+
+METAR = 'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016'
+ARGS = { 'metar': METAR, 'rwy': '03', 'letter': 'A', 'show_freqs': '' }
+
+class TestFlaskRun(unittest.TestCase):
+
+    def setUp(self):
+        self.client = flaskrun.app.test_client()
+        flaskrun.responses.clear()
+
+    def admin(self, token):
+        return { 'Authorization': 'Bearer %s' % token }
+
+    def test_message(self):
+        response = self.client.get('/', query_string=ARGS)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), message(
+            METAR,
+            '03',
+            'A',
+            settings.AIRPORTS,
+            settings.TRANSITION,
+            False,
+            False,
+            False,
+            False))
+
+    def test_wrong_usage(self):
+        response = self.client.get('/', query_string={ 'rwy': '03' })
+        self.assertEqual(response.get_data(as_text=True), 'wrong usage')
+
+    def test_admin_disabled_without_token(self):
+        with mock.patch.object(settings, 'ADMIN_TOKEN', None):
+            for headers in ({}, self.admin(None), self.admin('')):
+                response = self.client.get('/admin/traces', headers=headers)
+                self.assertEqual(response.status_code, 403)
+
+    def test_admin_token(self):
+        with mock.patch.object(settings, 'ADMIN_TOKEN', 'secret'):
+            for headers in ({}, self.admin('wrong'),
+                            { 'Authorization': 'secret' }):
+                response = self.client.get('/admin/traces', headers=headers)
+                self.assertEqual(response.status_code, 403)
+            response = self.client.get(
+                '/admin/traces', headers=self.admin('secret'))
+            self.assertEqual(response.status_code, 200)
+            self.assertIsInstance(response.get_json(), list)
+
+    def test_profiling_disabled_by_default(self):
+        with mock.patch.object(settings, 'ADMIN_TOKEN', 'secret'):
+            response = self.client.get(
+                '/admin/profile', headers=self.admin('secret'))
+            self.assertEqual(response.status_code, 404)
+            response = self.client.get('/', query_string=ARGS,
+                headers=dict(self.admin('secret'), **{ 'X-Profile': 'text' }))
+            self.assertTrue(response.get_data(as_text=True).startswith(
+                '[LPPT ATIS]'))
+
+    def test_profile_reply(self):
+        with mock.patch.object(settings, 'ADMIN_TOKEN', 'secret'), \
+                mock.patch.object(settings, 'PROFILING_ENABLED', True):
+            response = self.client.get('/', query_string=ARGS,
+                headers={ 'X-Profile': 'text' })
+            self.assertTrue(response.get_data(as_text=True).startswith(
+                '[LPPT ATIS]'))
+            response = self.client.get('/', query_string=ARGS,
+                headers=dict(self.admin('secret'), **{ 'X-Profile': 'text' }))
+            self.assertIn('function calls', response.get_data(as_text=True))
+
+    def test_armed_profile(self):
+        with mock.patch.object(settings, 'ADMIN_TOKEN', 'secret'), \
+                mock.patch.object(settings, 'PROFILING_ENABLED', True):
+            response = self.client.post(
+                '/admin/profile?requests=1&format=text')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.post(
+                '/admin/profile?requests=1&format=text',
+                headers=self.admin('secret'))
+            self.assertEqual(response.get_json(),
+                { 'requests': 1, 'format': 'text' })
+            self.client.get('/', query_string=ARGS)
+            response = self.client.get(
+                '/admin/profile', headers=self.admin('secret'))
+            self.assertEqual(response.headers['X-Profile-Remaining'], '0')
+            self.assertIn('function calls', response.get_data(as_text=True))
+        # the profile stopped with the request
+        self.assertFalse(profiling._busy.locked())
+
+    def test_batch(self):
+        response = self.client.post('/batch', json=[
+            ARGS, dict(ARGS, metar='METAR EGLL 191800Z CAVOK 11/06 Q1016')])
+        self.assertEqual(response.status_code, 200)
+        atis = response.get_json()
+        self.assertTrue(atis[0].startswith('[LPPT ATIS]'))
+        self.assertEqual(atis[1], '[ATIS OUT OF SERVICE]')
+
+    def test_batch_wrong_usage(self):
+        for entries in ({ 'metar': METAR }, [dict(ARGS, letter=1)],
+                        [dict(ARGS, hiro=[1])], [{ 'rwy': '03' }]):
+            response = self.client.post('/batch', json=entries)
+            self.assertEqual(response.status_code, 400, entries)
+
+    def test_metrics(self):
+        self.client.get('/', query_string=ARGS)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('messagemaker_message_seconds_count',
+            response.get_data(as_text=True))
+
+    def test_trace_header(self):
+        with mock.patch.object(tracing, 'SAMPLE_RATE', 1.0):
+            response = self.client.get('/', query_string=ARGS)
+        trace_id = response.headers['X-Trace-Id']
+        self.assertIn(trace_id,
+            { trace['trace_id'] for trace in tracing.traces.query() })
+        with mock.patch.object(tracing, 'SAMPLE_RATE', 0.0):
+            response = self.client.get('/', query_string=ARGS)
+        self.assertNotIn('X-Trace-Id', response.headers)
+
+    def test_audio(self):
+        response = self.client.get('/audio', query_string=ARGS)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'audio/wav')
+        self.assertEqual(response.data[:4], b'RIFF')
+
+    def test_audio_braces_in_letter(self):
+        response = self.client.get(
+            '/audio', query_string=dict(ARGS, letter='A]{-5}'))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            '/audio', query_string=dict(ARGS, letter='A]{1'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_audio_wrong_format(self):
+        response = self.client.get(
+            '/audio', query_string=dict(ARGS, format='mp3'))
+        self.assertEqual(response.status_code, 400)
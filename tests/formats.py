@@ -0,0 +1,98 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from io import BytesIO
+import wave
+import warnings
+import numpy as np
+from ddt import ddt, data
+
+from messagemaker.audio import load_clips, render
+from messagemaker.formats import *
+import settings
+
+# reference G.711 coding, gone from Python 3.13 on
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:
+        audioop = None
+
+SAMPLES = np.arange(-32768, 32768, dtype=np.int32)
+
+@ddt
+class TestFormats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.clips = load_clips(settings.AUDIO_PATH)
+
+    @unittest.skipIf(audioop is None, 'no audioop to compare with')
+    def test_ulaw(self):
+        self.assertEqual(
+            ulaw(SAMPLES).tobytes(),
+            audioop.lin2ulaw(SAMPLES.astype('<i2').tobytes(), 2))
+
+    @unittest.skipIf(audioop is None, 'no audioop to compare with')
+    def test_alaw(self):
+        self.assertEqual(
+            alaw(SAMPLES).tobytes(),
+            audioop.lin2alaw(SAMPLES.astype('<i2').tobytes(), 2))
+
+    def test_resample_keeps_clips_apart(self):
+        samples = np.array([0, 100, 200, 300, -50, -50], dtype=np.int32)
+        lengths = np.array([4, 2])
+        resampled, new_lengths = resample(samples, lengths, 2, 4)
+        self.assertEqual(new_lengths.tolist(), [8, 4])
+        self.assertEqual(
+            resampled.tolist(),
+            [0, 50, 100, 150, 200, 250, 300, 300, -50, -50, -50, -50])
+
+    @data(*FORMATS)
+    def test_convert(self, name):
+        format = FORMATS[name]
+        clips = convert(self.clips, format)
+        self.assertEqual(clips.index.names, self.clips.index.names)
+        duration = len(self.clips['QNH']) / PCM.width / PCM.rate
+        self.assertAlmostEqual(
+            len(clips['QNH']) / format.width / format.rate, duration, places=3)
+
+    @data('pcm', 'pcm8k')
+    def test_pcm_wav(self, name):
+        clips = convert(self.clips, FORMATS[name])
+        with wave.open(BytesIO(render('[QNH] 1016', clips))) as output:
+            self.assertEqual(output.getframerate(), FORMATS[name].rate)
+
+    def test_ulaw_wav(self):
+        clips = convert(self.clips, FORMATS['ulaw'])
+        atis = render('[QNH] 1016', clips)
+        self.assertEqual(atis[20:22], b'\x07\x00')
+        self.assertTrue(atis.endswith(bytes(clips['6'])))
+
+    def test_sizes(self):
+        sizes = { name: len(convert(self.clips, format)['QNH'])
+                  for name, format in FORMATS.items() }
+        # pcm8k is kept for compatibility, not size
+        self.assertGreater(sizes['pcm8k'], sizes['pcm'])
+        self.assertLess(sizes['ulaw'], sizes['pcm'] * 0.6)
+        self.assertEqual(sizes['ulaw'], sizes['alaw'])
@@ -20,10 +20,15 @@ along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import unittest
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 from ddt import ddt, data, unpack
 from metar import Metar
 
 from messagemaker.message import *
+from messagemaker.breaker import CircuitOpen
+import messagemaker.message
 import settings
 
 @ddt
@@ -173,3 +178,127 @@ class TestIntegration(unittest.TestCase):
                 False,
                 True)
         self.assertNotIn('RWY 35 CLSD FOR TKOF AND LDG AVBL TO TAXI', msg)
+
+    def test_message_batch(self):
+        entries = [
+            ('METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016',
+                '03', 'A', False, True, False, False),
+            ('METAR LPFR 191800Z 35015KT CAVOK 11/06 Q1016',
+                '10', 'B', False, False, False, False),
+            ('METAR EGLL 191800Z 35015KT CAVOK 11/06 Q1016',
+                '27', 'C', False, False, False, False),
+        ]
+        timed = messages_timed()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            atis = message_batch(
+                entries,
+                settings.AIRPORTS,
+                settings.TRANSITION,
+                executor)
+        self.assertEqual(messages_timed(), timed + 3)
+        self.assertEqual(atis[0], message(
+            *entries[0][:3],
+            settings.AIRPORTS,
+            settings.TRANSITION,
+            *entries[0][3:]))
+        self.assertIn('[LPFR ATIS] [B]', atis[1])
+        self.assertEqual(atis[2], '[ATIS OUT OF SERVICE]')
+
+    def test_message_try_async_timed(self):
+        timed = messages_timed()
+        msg = asyncio.run(message_try_async(
+            'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016',
+            '03',
+            self.letter,
+            settings.AIRPORTS,
+            settings.TRANSITION,
+            False,
+            False,
+            False,
+            False))
+        self.assertIn('[LPPT ATIS]', msg)
+        self.assertEqual(messages_timed(), timed + 1)
+
+    def test_parse_metar_memoized(self):
+        metar = 'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016'
+        parsed_metars.clear()
+        hits = parsed_metars.hits
+        report = parse_metar(metar)
+        self.assertIs(parse_metar(metar), report)
+        self.assertEqual(parsed_metars.hits, hits + 1)
+
+    def test_message_without_vatsim(self):
+        metar = 'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016'
+        with mock.patch.object(messagemaker.message, 'fetch_stations',
+                side_effect=CircuitOpen('vatsim')):
+            msg = message_try(
+                metar,
+                self.rwy,
+                self.letter,
+                settings.AIRPORTS,
+                settings.TRANSITION,
+                True)
+        self.assertNotEqual(msg, '[ATIS OUT OF SERVICE]')
+        self.assertNotIn('CONTACT', msg)
+        self.assertEqual(msg, message(
+            metar,
+            self.rwy,
+            self.letter,
+            settings.AIRPORTS,
+            settings.TRANSITION,
+            False,
+            False,
+            False,
+            False))
+
+    def test_compose_changed_sections(self):
+        def compose_metar(metar, rwy='03', hiro=False):
+            return compose(
+                parse_metar(metar),
+                rwy,
+                self.letter,
+                settings.AIRPORTS['LPPT'],
+                settings.TRANSITION,
+                None,
+                hiro,
+                False,
+                False)
+        atis_states.clear()
+        first = compose_metar('METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016')
+        self.assertEqual(first.changed, { name for name, *_ in WEATHER_SECTIONS })
+
+        new = 'METAR LPPT 191830Z 35015KT CAVOK 11/06 Q1017'
+        self.assertEqual(compose_metar(new).changed,
+            { 'transition_level', 'qnh' })
+        # the same report again reports the same changes
+        self.assertEqual(compose_metar(new).changed,
+            { 'transition_level', 'qnh' })
+        # other request arguments keep their own previous report
+        self.assertEqual(compose_metar(new, hiro=True).changed,
+            first.changed)
+
+    def test_compose_cavok_to_no_weather(self):
+        def compose_metar(metar):
+            return compose(
+                parse_metar(metar),
+                '03',
+                self.letter,
+                settings.AIRPORTS['LPPT'],
+                settings.TRANSITION,
+                None,
+                False,
+                False,
+                False)
+        metar = 'METAR LPPT 191830Z 35015KT 9999 SCT027 11/06 Q1016'
+        atis_states.clear()
+        fresh = compose_metar(metar)
+        atis_states.clear()
+        compose_metar('METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1016')
+        after_cavok = compose_metar(metar)
+        self.assertEqual(after_cavok, fresh)
+        self.assertEqual(after_cavok.parts, fresh.parts)
+        self.assertIn('weather', after_cavok.changed)
+
+def messages_timed():
+    counts, _ = message_seconds.values.get((), ([0], 0))
+    return sum(counts)
@@ -0,0 +1,112 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from messagemaker.metarcache import MetarCache
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+class Upstream:
+
+    def __init__(self, *reports):
+        self.reports = list(reports)
+        self.calls = 0
+
+    def __call__(self, icao):
+        self.calls += 1
+        # the last report keeps being served
+        report = self.reports.pop(0) if len(self.reports) > 1 \
+            else self.reports[0]
+        if isinstance(report, Exception):
+            raise report
+        return report
+
+def eventually(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestMetarCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+
+    def test_first_request_fetches(self):
+        upstream = Upstream('METAR LPPT A')
+        cache = MetarCache(upstream, max_age=300, clock=self.clock)
+        self.assertEqual(cache.get('LPPT'), 'METAR LPPT A')
+        self.assertEqual(cache.get('LPPT'), 'METAR LPPT A')
+        self.assertEqual(upstream.calls, 1)
+
+    def test_concurrent_first_requests_fetch_once(self):
+        release = Event()
+        upstream = Upstream('METAR LPPT A')
+        def slow(icao):
+            release.wait()
+            return upstream(icao)
+        cache = MetarCache(slow, max_age=300, clock=self.clock)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            reports = [executor.submit(cache.get, 'LPPT') for _ in range(4)]
+            self.assertTrue(eventually(lambda: cache.flight.shared == 3))
+            release.set()
+        self.assertEqual([report.result() for report in reports],
+            ['METAR LPPT A'] * 4)
+        self.assertEqual(upstream.calls, 1)
+
+    def test_listeners_told_of_new_reports(self):
+        updated = []
+        cache = MetarCache(Upstream('METAR LPPT A'), clock=self.clock)
+        cache.listeners.append(updated.append)
+        cache.put('LPPT', 'METAR LPPT A')
+        cache.put('LPPT', 'METAR LPPT A')
+        cache.put('LPPT', 'METAR LPPT B')
+        self.assertEqual(updated, ['LPPT'])
+
+    def test_stale_served_while_refreshing(self):
+        upstream = Upstream('METAR LPPT A', 'METAR LPPT B')
+        cache = MetarCache(upstream, max_age=300, clock=self.clock)
+        cache.get('LPPT')
+        self.clock.now = 300
+        self.assertEqual(cache.get('LPPT'), 'METAR LPPT A')
+        self.assertTrue(eventually(
+            lambda: cache.get('LPPT') == 'METAR LPPT B'))
+        self.assertEqual(upstream.calls, 2)
+
+    def test_keeps_last_good_on_failure(self):
+        upstream = Upstream('METAR LPPT A', IOError('avwx down'))
+        cache = MetarCache(upstream, max_age=300, clock=self.clock)
+        cache.get('LPPT')
+        self.clock.now = 300
+        self.assertEqual(cache.get('LPPT'), 'METAR LPPT A')
+        self.assertTrue(eventually(lambda: cache.failures >= 1))
+        self.assertEqual(cache.get('LPPT'), 'METAR LPPT A')
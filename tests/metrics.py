@@ -0,0 +1,82 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+from messagemaker import metrics
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counter(self):
+        counter = metrics.Counter('requests_total', 'Requests', ('path',))
+        counter.inc('/')
+        counter.inc('/', amount=2)
+        counter.inc('/audio')
+        self.assertEqual(metrics.render([counter]),
+            '# HELP requests_total Requests\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{path="/"} 3\n'
+            'requests_total{path="/audio"} 1\n')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('took', 'Took', buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(2)
+        lines = metrics.render([histogram]).splitlines()
+        self.assertEqual(lines[2:], [
+            'took_bucket{le="0.1"} 2',
+            'took_bucket{le="1"} 3',
+            'took_bucket{le="+Inf"} 4',
+            'took_sum 2.65',
+            'took_count 4',
+        ])
+
+    def test_time(self):
+        histogram = metrics.Histogram('took', 'Took', ('section',))
+        with histogram.time('wind'):
+            pass
+        counts, total = histogram.values[('wind',)]
+        self.assertEqual(sum(counts), 1)
+        self.assertGreaterEqual(total, 0)
+
+    def test_time_disabled(self):
+        histogram = metrics.Histogram('took', 'Took')
+        metrics.ENABLED = False
+        try:
+            with histogram.time():
+                pass
+        finally:
+            metrics.ENABLED = True
+        self.assertEqual(histogram.values, {})
+
+    def test_collected(self):
+        caches = { 'a': 3 }
+        collected = metrics.Collected('hits', 'Hits', ('cache',),
+            lambda: { (name,): hits for name, hits in caches.items() })
+        self.assertIn('hits{cache="a"} 3', metrics.render([collected]))
+
+    def test_label_escaped(self):
+        counter = metrics.Counter('errors', 'Errors', ('message',))
+        counter.inc('say "hi"\n')
+        self.assertIn(r'errors{message="say \"hi\"\n"} 1',
+            metrics.render([counter]))
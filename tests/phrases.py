@@ -0,0 +1,88 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from ddt import ddt, data, unpack
+
+from messagemaker.phrases import *
+import settings
+
+NAMES = (
+    '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'thousand', 'hundred',
+    'A', 'AND', 'CLD', 'DEG', 'FEW', 'FT', 'KM', 'QNH', 'RWY IN USE 03',
+    'RWY IN USE 21', 'TEMP', 'VIS', 'VRB', 'VRB BTN',
+)
+
+@ddt
+class TestPhraseIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = PhraseIndex(NAMES)
+
+    def names(self, message):
+        return [self.index.names[id] for id in self.index.resolve(message)]
+
+    @data(
+        ('0', ['0']),
+        ('300', ['3', 'hundred']),
+        ('1800', ['1', 'thousand', '8', 'hundred']),
+        ('4000', ['4', 'thousand']),
+        ('10000', ['1', '0', 'thousand']),
+    )
+    @unpack
+    def test_spoken_number(self, number, expected):
+        self.assertEqual(spoken_number(number), expected)
+
+    @data(
+        ('[QNH] 1016', ['QNH', '1', '0', '1', '6']),
+        ('[VIS] 10[KM]', ['VIS', '1', '0', 'KM']),
+        ('[VRB BTN] 120 [AND] 180 [DEG]',
+            ['VRB BTN', '1', '2', '0', 'AND', '1', '8', '0', 'DEG']),
+        ('[VRB] 4', ['VRB', '4']),
+        ('[CLD] [FEW] {1800} [FT]',
+            ['CLD', 'FEW', '1', 'thousand', '8', 'hundred', 'FT']),
+        ('[TEMP] -5', ['TEMP', '5']),
+        ('[RWY IN USE 21] [A]', ['RWY IN USE 21', 'A']),
+    )
+    @unpack
+    def test_resolve(self, message, expected):
+        self.assertEqual(self.names(message), expected)
+
+    def test_missing_phrase(self):
+        self.assertEqual(self.names('[HVY] [RWY IN USE 35] [A]'), ['A'])
+        self.assertEqual(self.index.missing, {'HVY', 'RWY IN USE 35'})
+
+    def test_malformed_braces(self):
+        self.assertEqual(self.names('[QNH] {-5} [A]'), ['QNH', 'A'])
+        self.assertEqual(self.names('[A]{1'), ['A'])
+        self.assertEqual(self.names('{} 1'), ['1'])
+        self.assertEqual(self.index.missing, {'{-5}', '{1', '{}'})
+
+    def test_validate(self):
+        self.assertEqual(
+            self.index.validate(('[RWY IN USE 03] [QNH]', '[EXP ILS APCH]')),
+            ['EXP ILS APCH'])
+
+    def test_airport_phrases(self):
+        phrases = list(airport_phrases('LPPT', settings.AIRPORTS['LPPT']))
+        self.assertIn('[LPPT ATIS]', phrases)
+        self.assertIn('[EXP ILS Z APCH]', phrases)
+        self.assertIn('[HIGH INTENSITY RWY OPS]', phrases)
@@ -0,0 +1,120 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from ddt import ddt, data, unpack
+from avweather.metar import parse
+
+from messagemaker.message import *
+from messagemaker.profile import cached_airport, compile_airports
+import settings
+
+@ddt
+class TestProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.airports = compile_airports(settings.AIRPORTS, settings.TRANSITION)
+        self.airport = self.airports['LPPT']
+
+    @data('03', '21', '35', '17')
+    def test_runways(self, rwy):
+        runway = self.airport.runways[rwy]
+        self.assertEqual(
+            runway.approach,
+            approach(rwy, settings.AIRPORTS['LPPT']))
+        self.assertEqual(
+            runway.arrdep_info,
+            arrdep_info(settings.AIRPORTS['LPPT'], rwy))
+
+    @data(
+        ('119.100', '118.100', '118.950'),
+        ('125.550', '121.750'),
+        ('118.100', '118.950', '135.000'),
+        (),
+    )
+    def test_freqinfo(self, *online_freqs):
+        self.assertEqual(
+            self.airport.freqinfo(online_freqs),
+            freqinfo(settings.AIRPORTS['LPPT'], online_freqs))
+
+    def test_freqinfo_memoized(self):
+        online = ('119.100', '118.100', '118.950', '135.000')
+        self.assertEqual(len(self.airport.freq_messages), 0)
+        message = self.airport.freqinfo(online)
+        self.assertIs(self.airport.freqinfo(online[:3]), message)
+        self.assertEqual(len(self.airport.freq_messages), 1)
+
+    def test_freqinfo_failure_not_kept(self):
+        # departure online without any clearance frequency
+        online = ('120.600',)
+        with self.assertRaises(TypeError):
+            freqinfo(settings.AIRPORTS['LPPT'], online)
+        for _ in range(2):
+            with self.assertRaises(TypeError):
+                self.airport.freqinfo(online)
+        self.assertEqual(len(self.airport.freq_messages), 0)
+
+    def test_static_parts_have_freqinfo(self):
+        parts = set(self.airport.static_parts())
+        self.assertIn(
+            freqinfo(settings.AIRPORTS['LPPT'], ('119.100', '118.100')),
+            parts)
+
+    def test_cached_airport(self):
+        airport = settings.AIRPORTS['LPPT']
+        profile = cached_airport('LPPT', airport, settings.TRANSITION)
+        self.assertIs(
+            cached_airport('LPPT', airport, settings.TRANSITION), profile)
+        self.assertIsNot(
+            cached_airport('LPPT', dict(airport), settings.TRANSITION),
+            profile)
+
+    @data(
+        'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q0942',
+        'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1013',
+        'METAR LPPT 191800Z 35015KT CAVOK 11/06 Q1051',
+    )
+    def test_transitionlevel(self, metar):
+        metar = parse(metar)
+        self.assertEqual(
+            self.airport.transition_level(metar),
+            transition_level(
+                settings.AIRPORTS['LPPT'],
+                settings.TRANSITION,
+                metar))
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.airport.hiro = None
+        with self.assertRaises(TypeError):
+            self.airport.runways['03'] = None
+
+    @data(
+        ('METAR LPPT 191800Z 35015KT 9999 SCT027 11/06 Q1016', '21'),
+        ('METAR LPFR 191800Z 35015KT CAVOK 11/06 Q1016', '10'),
+    )
+    @unpack
+    def test_message(self, metar, rwy):
+        self.assertEqual(
+            message(metar, rwy, 'A', self.airports, settings.TRANSITION,
+                False, True, True, True),
+            message(metar, rwy, 'A', settings.AIRPORTS, settings.TRANSITION,
+                False, True, True, True))
@@ -0,0 +1,88 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import marshal
+import time
+import types
+import unittest
+from unittest import mock
+
+from messagemaker import profiling
+
+def work():
+    deadline = time.perf_counter() + 0.02
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+class TestProfiling(unittest.TestCase):
+
+    def test_collapsed(self):
+        profile = profiling.Profile('collapsed')
+        self.assertTrue(profile.start())
+        work()
+        profile.stop()
+        body, mimetype = profile.output()
+        self.assertEqual(mimetype, 'text/plain')
+        stacks = dict(line.rsplit(' ', 1) for line in body.splitlines())
+        self.assertTrue(any(stack.endswith(':work') or ':work;' in stack
+                            for stack in stacks))
+        self.assertTrue(all(int(count) > 0 for count in stacks.values()))
+
+    def test_pstats(self):
+        profile = profiling.Profile('pstats')
+        profile.start()
+        work()
+        profile.stop()
+        body, mimetype = profile.output()
+        self.assertEqual(mimetype, 'application/octet-stream')
+        self.assertIn('work', { name for _, _, name in marshal.loads(body) })
+
+    def test_one_at_a_time(self):
+        profile = profiling.Profile('text')
+        self.assertTrue(profile.start())
+        try:
+            self.assertFalse(profiling.Profile('text').start())
+        finally:
+            profile.stop()
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            profiling.Profile('callgrind')
+
+    def test_armed(self):
+        armed = profiling.Armed()
+        self.assertIsNone(armed.take())
+        armed.arm(2, 'text')
+        for _ in range(3):
+            profile = armed.take()
+            if profile is not None:
+                work()
+                profile.stop()
+        self.assertEqual(armed.remaining, 0)
+        self.assertIn('work', armed.profile.output()[0])
+
+    def test_not_under_gevent(self):
+        monkey = types.ModuleType('gevent.monkey')
+        monkey.is_module_patched = lambda name: name == 'threading'
+        with mock.patch.dict('sys.modules', { 'gevent.monkey': monkey }):
+            self.assertFalse(profiling.supported())
+            self.assertFalse(profiling.Profile('collapsed').start())
+        self.assertTrue(profiling.supported())
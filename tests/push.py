@@ -0,0 +1,85 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+from messagemaker.push import Publisher
+
+class Renderer:
+
+    def __init__(self):
+        self.text = 'INFO A'
+        self.calls = 0
+
+    def __call__(self, airport):
+        self.calls += 1
+        return '%s %s' % (airport, self.text)
+
+class TestPublisher(unittest.TestCase):
+
+    def setUp(self):
+        self.render = Renderer()
+        self.publisher = Publisher(self.render, interval=60)
+
+    def test_subscriber_gets_current_message(self):
+        messages = iter(self.publisher.subscribe('LPPT', ('LPPT',), keepalive=5))
+        self.assertEqual(next(messages), 'LPPT INFO A')
+
+    def test_one_render_for_all_subscribers(self):
+        first = self.publisher.subscribe('LPPT', ('LPPT',), keepalive=5)
+        self.assertEqual(next(iter(first)), 'LPPT INFO A')
+        second = self.publisher.subscribe('LPPT', ('LPPT',), keepalive=5)
+        self.assertEqual(next(iter(second)), 'LPPT INFO A')
+
+        self.render.text = 'INFO B'
+        self.publisher.publish(self.publisher.topics['LPPT'])
+        self.assertEqual(next(iter(first)), 'LPPT INFO B')
+        self.assertEqual(next(iter(second)), 'LPPT INFO B')
+        self.assertEqual(self.render.calls, 2)
+
+    def test_unchanged_message_not_pushed(self):
+        subscription = self.publisher.subscribe('LPPT', ('LPPT',), keepalive=0.01)
+        next(iter(subscription))
+        self.publisher.publish(self.publisher.topics['LPPT'])
+        self.assertIsNone(next(iter(subscription)))
+
+    def test_topic_removed_without_subscribers(self):
+        subscription = self.publisher.subscribe('LPPT', ('LPPT',), keepalive=5)
+        subscription.close()
+        self.assertNotIn('LPPT', self.publisher.topics)
+
+    def test_rendered_only_for_new_versions(self):
+        versions = { 'LPPT': 'METAR LPPT A' }
+        publisher = Publisher(self.render, interval=60,
+            version=lambda airport: versions[airport])
+        subscription = publisher.subscribe('LPPT', ('LPPT',), keepalive=0.01)
+        next(iter(subscription))
+        topic = publisher.topics['LPPT']
+
+        self.render.text = 'INFO B'
+        publisher.publish(topic)
+        self.assertEqual(self.render.calls, 1)
+        self.assertIsNone(next(iter(subscription)))
+
+        versions['LPPT'] = 'METAR LPPT B'
+        publisher.publish(topic)
+        self.assertEqual(self.render.calls, 2)
+        self.assertEqual(next(iter(subscription)), 'LPPT INFO B')
@@ -0,0 +1,54 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+import numpy as np
+
+from messagemaker.audio import Clips, PCM, render
+from messagemaker.formats import FORMATS, ulaw
+from messagemaker.silence import trim, silence
+
+def pcm(*samples):
+    return np.array(samples, dtype='<i2').tobytes()
+
+class TestSilence(unittest.TestCase):
+
+    def test_trim(self):
+        frames = np.zeros(1000, dtype='<i2')
+        frames[400:500] = 10000
+        trimmed = trim(frames.tobytes(), rate=1000, window=10, padding=20)
+        self.assertEqual(len(trimmed), 2 * (100 + 2 * 20))
+
+    def test_trim_all_silence(self):
+        frames = pcm(*[0] * 100)
+        self.assertEqual(trim(frames, rate=1000), frames)
+
+    def test_silence(self):
+        self.assertEqual(silence(PCM, 10), b'\0' * 2 * 73)
+        self.assertEqual(
+            silence(FORMATS['ulaw'], 10),
+            ulaw(np.zeros(80, dtype=np.int32)).tobytes())
+
+    def test_gap_between_clips(self):
+        clips = Clips({ 'A': pcm(1), 'B': pcm(2) })
+        clips.gap = pcm(0)
+        self.assertTrue(render('[A] [B] [A]', clips).endswith(
+            pcm(1, 0, 2, 0, 1)))
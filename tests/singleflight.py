@@ -0,0 +1,94 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from messagemaker import client
+from messagemaker.singleflight import SingleFlight
+from tests.metarcache import eventually
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.release = Event()
+        self.calls = 0
+
+    def slow(self, result):
+        self.calls += 1
+        self.release.wait()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def concurrently(self, key, result, count=3):
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(self.flight.do, key, self.slow, result)
+                        for _ in range(count)]
+            self.assertTrue(eventually(
+                lambda: self.flight.shared == count - 1))
+            self.release.set()
+        return futures
+
+    def test_shared_result(self):
+        futures = self.concurrently('LPPT', 'METAR LPPT A')
+        self.assertEqual([future.result() for future in futures],
+            ['METAR LPPT A'] * 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_shared_exception(self):
+        futures = self.concurrently('LPPT', ValueError('down'))
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            self.assertIsInstance(error, ValueError)
+            self.assertEqual(str(error), 'down')
+        # each waiter raises its own, chained to the one raised by the call
+        self.assertEqual(len(set(map(id, errors))), 3)
+        self.assertEqual(sum(error.__cause__ is None for error in errors), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_waiters_keep_their_deadline(self):
+        def waiter():
+            with client.deadline(0.1):
+                return self.flight.do('LPPT', self.slow, 'METAR LPPT A')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(self.flight.do, 'LPPT', self.slow, 'A')
+            self.assertTrue(eventually(lambda: self.calls == 1))
+            with self.assertRaises(client.DeadlineExceeded):
+                executor.submit(waiter).result(timeout=5)
+            self.release.set()
+            self.assertEqual(leader.result(), 'A')
+
+    def test_calls_again_once_done(self):
+        self.release.set()
+        self.assertEqual(self.flight.do('LPPT', self.slow, 'A'), 'A')
+        self.assertEqual(self.flight.do('LPPT', self.slow, 'B'), 'B')
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight.shared, 0)
+
+    def test_keys_are_independent(self):
+        self.release.set()
+        self.flight.do('LPPT', self.slow, 'A')
+        self.flight.do('LPPR', self.slow, 'B')
+        self.assertEqual(self.flight.calls, 2)
@@ -0,0 +1,72 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+from messagemaker.state import SectionState
+
+SECTIONS = (
+    ('wind',
+        lambda report: report['wind'],
+        lambda report: '[WND] %s' % report['wind']),
+    ('qnh',
+        lambda report: report['qnh'],
+        lambda report: '[QNH] %s' % report['qnh']),
+)
+
+class TestSectionState(unittest.TestCase):
+
+    def setUp(self):
+        self.state = SectionState(SECTIONS)
+
+    def test_first_update_renders_all(self):
+        sections, changed = self.state.update({ 'wind': 350, 'qnh': 1016 })
+        self.assertEqual(sections, { 'wind': '[WND] 350', 'qnh': '[QNH] 1016' })
+        self.assertEqual(changed, { 'wind', 'qnh' })
+
+    def test_only_changed_sections_render(self):
+        self.state.update({ 'wind': 350, 'qnh': 1016 })
+        sections, changed = self.state.update({ 'wind': 350, 'qnh': 1017 })
+        self.assertEqual(sections['qnh'], '[QNH] 1017')
+        self.assertEqual(sections['wind'], '[WND] 350')
+        self.assertEqual(changed, { 'qnh' })
+        self.assertEqual(self.state.renders, 3)
+
+    def test_same_inputs_report_the_same_changes(self):
+        self.state.update({ 'wind': 350, 'qnh': 1016 })
+        self.state.update({ 'wind': 350, 'qnh': 1017 })
+        _, changed = self.state.update({ 'wind': 350, 'qnh': 1017 })
+        self.assertEqual(changed, { 'qnh' })
+        self.assertEqual(self.state.renders, 3)
+
+    def test_failed_render_is_retried(self):
+        def render(report):
+            if report['qnh'] is None:
+                raise ValueError('no pressure')
+            return '[QNH] %s' % report['qnh']
+        state = SectionState((('qnh', lambda report: report['qnh'], render),))
+
+        with self.assertRaises(ValueError):
+            state.update({ 'qnh': None })
+        with self.assertRaises(ValueError):
+            state.update({ 'qnh': None })
+        _, changed = state.update({ 'qnh': 1016 })
+        self.assertEqual(changed, { 'qnh' })
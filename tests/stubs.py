@@ -0,0 +1,131 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+## local stand-ins for the upstream services, to test without network
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import urlsplit, parse_qs
+import json
+import random
+import sys
+import time
+
+class StubServer(ThreadingHTTPServer):
+    """Serves `handle(path, query)` results on a free local port
+
+    Every answer is delayed by `latency` seconds, carries `headers`, and
+    `error_rate` of them are server errors."""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0, error_rate=0):
+        self.requests = 0
+        self.latency = latency
+        self.error_rate = error_rate
+        self.headers = {}
+        super().__init__(('127.0.0.1', 0), StubHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle(self, path, query):
+        """(status, body) for a GET, subclasses answer their own paths"""
+        return 404, {}
+
+    def handle_error(self, request, client_address):
+        # clients that gave up waiting on a slow answer
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    # keep-alive, as the real upstreams
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.error_rate:
+            status, body = 500, {}
+        else:
+            status, body = self.server.handle(url.path, parse_qs(url.query))
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in self.server.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class VatsimStub(StubServer):
+    """vatsim-status-proxy `/clients` endpoint, filtered by frequency"""
+
+    def __init__(self, stations=(), **kwargs):
+        super().__init__(**kwargs)
+        self.stations = list(stations)
+        self.status = 200
+
+    def handle(self, path, query):
+        if path != '/clients':
+            return 404, {}
+        if self.status != 200:
+            return self.status, {}
+        where = json.loads(query['where'][0])
+        freqs = { clause['frequency'] for clause in where['$or'] }
+        return 200, { '_items': [station for station in self.stations
+                                    if station['frequency'] in freqs] }
+
+    @property
+    def clients_url(self):
+        return self.url + '/clients'
+
+class AvwxStub(StubServer):
+    """avwx `/api/metar/<icao>` endpoint, answers the reports in `metars`"""
+
+    def __init__(self, metars=None, **kwargs):
+        super().__init__(**kwargs)
+        self.metars = dict(metars or {})
+
+    def handle(self, path, query):
+        prefix = '/api/metar/'
+        if not path.startswith(prefix) or path[len(prefix):] not in self.metars:
+            return 404, {}
+        return 200, { 'Raw-Report': self.metars[path[len(prefix):]] }
+
+    @property
+    def metar_url(self):
+        return self.url + '/api/metar'
@@ -0,0 +1,77 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+
+from messagemaker import tracing
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.traces = tracing.traces
+        tracing.traces = tracing.Traces(size=2)
+
+    def tearDown(self):
+        tracing.traces = self.traces
+
+    def test_not_sampled(self):
+        self.assertIsNone(tracing.start('/', sample_rate=0))
+        with tracing.span('wind'):
+            pass
+        self.assertEqual(len(tracing.traces), 0)
+
+    def test_spans(self):
+        trace = tracing.start('/', { 'metar': 'LPPT' }, sample_rate=1)
+        self.assertIs(tracing.current(), trace)
+        with tracing.span('metar'):
+            with tracing.span('avwx'):
+                pass
+        tracing.finish(trace)
+        self.assertIsNone(tracing.current())
+
+        [recorded] = tracing.traces.query()
+        self.assertEqual(recorded['trace_id'], trace.id)
+        self.assertEqual(recorded['attrs'], { 'metar': 'LPPT' })
+        self.assertEqual([span['name'] for span in recorded['spans']],
+            ['avwx', 'metar'])
+
+    def test_ring_buffer(self):
+        for name in ('a', 'b', 'c'):
+            tracing.finish(tracing.start(name, sample_rate=1))
+        self.assertEqual([trace['name'] for trace in tracing.traces.query()],
+            ['c', 'b'])
+        self.assertEqual(len(tracing.traces.query(limit=1)), 1)
+        self.assertEqual(tracing.traces.query(min_ms=60000), [])
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'traces.log')
+            tracing.traces = tracing.Traces(path=path)
+            trace = tracing.start('/', sample_rate=1)
+            tracing.finish(trace)
+            for handler in tracing.traces.log.handlers:
+                handler.close()
+            with open(path) as log:
+                self.assertEqual(json.loads(log.readline())['trace_id'],
+                    trace.id)
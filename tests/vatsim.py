@@ -0,0 +1,92 @@
+"""
+Message Maker
+
+Copyright (C) 2018  Pedro Rodrigues <prodrigues1990@gmail.com>
+
+This file is part of messagemaker.
+
+Message Maker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 2 of the License.
+
+Message Maker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Message Maker.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+from messagemaker.vatsim import MISSED_POLLS, StationPoller, fetch_stations
+from tests.cache import Clock
+from tests.stubs import VatsimStub
+import settings
+
+STATIONS = (
+    { 'callsign': 'LPPT_TWR', 'frequency': '118.100' },
+    { 'callsign': 'LPPT_DEL', 'frequency': '118.950' },
+    { 'callsign': 'LPPC_CTR', 'frequency': '125.550' },
+    { 'callsign': 'LPPR_TWR', 'frequency': '118.000' },
+    { 'callsign': 'EGLL_TWR', 'frequency': '118.500' },
+)
+
+class TestStationPoller(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = VatsimStub(STATIONS).start()
+        self.clock = Clock()
+        self.poller = StationPoller(clock=self.clock)
+        self.poller.airports = settings.AIRPORTS
+        self.poller.url = self.stub.clients_url
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_fetch_stations_filters_frequencies(self):
+        stations = fetch_stations(('118.100',), self.stub.clients_url)
+        self.assertEqual(stations, [STATIONS[0]])
+
+    def test_poll_builds_index(self):
+        self.poller.poll()
+        self.assertEqual(self.poller.index['118.100'], {'LPPT_TWR'})
+        self.assertNotIn('118.500', self.poller.index)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_online_by_airport(self):
+        self.poller.poll()
+        self.assertEqual(
+            set(self.poller.online('LPPT')),
+            {'118.100', '118.950', '125.550'})
+        self.assertEqual(
+            set(self.poller.online('LPPR')),
+            {'118.000', '125.550'})
+        self.assertIsNone(self.poller.online('EGLL'))
+
+    def test_keeps_last_stations_on_failure(self):
+        self.poller.poll()
+        self.stub.status = 500
+        self.poller.poll()
+        self.assertEqual(self.poller.failures, 1)
+        self.assertIn('118.100', self.poller.online('LPPT'))
+
+    def test_last_stations_expire(self):
+        self.poller.poll()
+        self.stub.status = 500
+        for _ in range(MISSED_POLLS):
+            self.clock.now += self.poller.interval
+            self.poller.poll()
+            self.assertIn('118.100', self.poller.online('LPPT'))
+        self.clock.now += 1
+        self.assertIsNone(self.poller.online('LPPT'))
+
+        self.stub.status = 200
+        self.poller.poll()
+        self.assertIn('118.100', self.poller.online('LPPT'))
+
+    def test_not_polled(self):
+        self.assertIsNone(self.poller.online('LPPT'))
+        self.assertFalse(self.poller.running)